@@ -3,11 +3,18 @@
 # ===============================
 
 import os
+import sys
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
 from streamlit_autorefresh import st_autorefresh
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+
+from panel import open_panel
+from snapshot import open_snapshot
+from signal_store import SignalStore
+
 # ===============================
 # AUTO REFRESH (5 minutes)
 # ===============================
@@ -83,10 +90,10 @@ st.divider()
 # ===============================
 st.subheader("📈 Learning Curve")
 
-learning_file = os.path.join(REPORT_DIR, "daily_learning.xlsx")
+signal_store = SignalStore()
+df = signal_store.summaries()
 
-if os.path.exists(learning_file):
-    df = pd.read_excel(learning_file)
+if not df.empty:
 
     fig, ax = plt.subplots()
     ax.plot(df["date"], df["win_rate"], marker="o")
@@ -107,10 +114,10 @@ st.divider()
 # ===============================
 st.subheader("🧠 Signal Intelligence")
 
-signal_log = os.path.join(REPORT_DIR, "signal_log.xlsx")
+s = signal_store.signals()
+signal_store.close()
 
-if os.path.exists(signal_log):
-    s = pd.read_excel(signal_log)
+if not s.empty:
 
     fig, ax = plt.subplots()
     s["signal_score"].hist(bins=25, ax=ax)
@@ -159,24 +166,23 @@ st.caption("Market AI Dashboard — auto-refreshes every 5 minutes")
 st.divider()
 st.subheader("🔍 Stock Drilldown (Click-to-Analyze)")
 
-feature_files = []
-if os.path.exists(FEATURE_DIR):
-    feature_files = sorted([f.replace(".csv", "") for f in os.listdir(FEATURE_DIR) if f.endswith(".csv")])
+# Both drilldowns read the memmap panel instead of the per-symbol CSVs;
+# the latest-value metrics come from the in-memory feature snapshot
+panel = open_panel("features")
+snapshot = open_snapshot("features")
+feature_files = panel.symbols
 
 if not feature_files:
     st.warning("No feature files available for drilldown")
 else:
     symbol = st.selectbox("Select Stock", feature_files)
 
-    file_path = os.path.join(FEATURE_DIR, f"{symbol}.csv")
-
     try:
-        df = pd.read_csv(file_path)
+        df = panel.frame(symbol)
 
         if len(df) < 50:
             st.warning("Not enough data for this stock")
         else:
-            df["date"] = pd.to_datetime(df["date"])
 
             # -------------------------------
             # PRICE + EMA CHART
@@ -210,7 +216,7 @@ else:
             # -------------------------------
             # ATR & TREND INFO
             # -------------------------------
-            last = df.iloc[-1]
+            last = snapshot.latest(symbol)
             atr_pct = (last["atr_14"] / last["close"]) * 100
 
             c1, c2, c3 = st.columns(3)
@@ -226,10 +232,8 @@ else:
 st.divider()
 st.subheader("🔍 Stock Drill-Down Analysis")
 
-if os.path.exists(FEATURE_DIR):
-    stock_files = sorted(
-        [f.replace(".csv", "") for f in os.listdir(FEATURE_DIR) if f.endswith(".csv")]
-    )
+if panel.symbols:
+    stock_files = panel.symbols
 
     selected_stock = st.selectbox(
         "Select a stock",
@@ -237,10 +241,8 @@ if os.path.exists(FEATURE_DIR):
         index=0
     )
 
-    stock_file = os.path.join(FEATURE_DIR, f"{selected_stock}.csv")
-
-    if os.path.exists(stock_file):
-        df = pd.read_csv(stock_file)
+    if selected_stock in panel:
+        df = panel.frame(selected_stock)
 
         if len(df) < 50:
             st.warning("Not enough data for this stock yet")
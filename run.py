@@ -1,15 +1,27 @@
 import os
+import sys
 import json
+import numpy as np
 import pandas as pd
-import yfinance as yf
 from datetime import date, datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+
+from price_sources import get_price_source
+from market_data import MarketData
+from atr_learning import optimize_multipliers, stack_series
+from state_store import StateStore
+from indicators import atr_feature, evaluate
+
 # ======================================================
 # CONFIG
 # ======================================================
 UNIVERSE_FILE = "universe/nifty500.csv"
-DATA_DIR = "data/prices"
 STATE_DIR = "state"
+STATE_DB = "state/market_ai.db"
+
+# Legacy per-symbol state, imported into STATE_DB once
+DATA_DIR = "data/prices"
 LEARN_DIR = "state/learned_atr"
 
 ATR_LOOKBACK_DAYS = 365
@@ -18,6 +30,13 @@ ATR_WINDOW = 14
 MIN_ROWS = 20
 DEFAULT_ATR_MULTIPLIER = 1.5
 
+# Candidate multipliers for weekly learning; any grid works, e.g.
+# [round(0.5 + 0.05 * i, 2) for i in range(51)] for 0.5-3.0 in 0.05 steps
+ATR_MULTIPLIER_GRID = [1.0, 1.2, 1.5, 1.8, 2.0]
+
+# Symbols per batched (multi-ticker) download
+FETCH_BATCH_SIZE = 50
+
 TODAY = date.today().isoformat()
 
 # ======================================================
@@ -30,9 +49,7 @@ SYMBOL_OVERRIDES = {
 # ======================================================
 # SETUP
 # ======================================================
-os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(STATE_DIR, exist_ok=True)
-os.makedirs(LEARN_DIR, exist_ok=True)
 
 print("STEP 11: FULLY AUTOMATED MULTI-STOCK SYSTEM STARTED")
 
@@ -47,6 +64,19 @@ if os.path.exists(LOCK_FILE):
             print("Already ran today. Exiting.")
             exit()
 
+# ======================================================
+# LOAD STATE (ONE BULK READ)
+# ======================================================
+store = StateStore(STATE_DB)
+
+migrated = store.migrate(STATE_DIR, LEARN_DIR, DATA_DIR)
+if migrated:
+    print(f"Migrated {migrated} legacy state files into {STATE_DB}")
+
+learn_dates = store.learn_dates()
+learned = store.learned_multipliers()
+last_stoploss = store.last_stoplosses()
+
 # ======================================================
 # LOAD UNIVERSE
 # ======================================================
@@ -60,170 +90,190 @@ if "symbol" not in universe.columns or "yahoo_symbol" not in universe.columns:
 
 print(f"TOTAL STOCKS IN UNIVERSE: {len(universe)}")
 
+data = MarketData(get_price_source(), stage="run")
+
 # ======================================================
-# MAIN LOOP
+# ATR
 # ======================================================
-for idx, row in universe.iterrows():
-    symbol = str(row["symbol"]).strip()
-    yahoo_symbol = SYMBOL_OVERRIDES.get(symbol, row["yahoo_symbol"])
+# True range and ATR come from the shared indicator registry
+ATR_FEATURE = atr_feature(ATR_WINDOW)
 
-    print(f"\n[{idx+1}/{len(universe)}] Processing {symbol}")
 
-    try:
-        # ==================================================
-        # WEEKLY LEARNING CHECK
-        # ==================================================
-        learn_flag = True
-        learn_date_file = f"{STATE_DIR}/last_learn_{symbol}.json"
+def add_atr(df):
+    out = evaluate(
+        {c.lower(): df[[c]].to_numpy(dtype=float) for c in ("Close", "High", "Low")},
+        ["prev_close", ATR_FEATURE]
+    )
+    df["ATR"] = out[ATR_FEATURE][:, 0]
+    # a bar without a previous close has no complete true range
+    return df[~np.isnan(out["prev_close"][:, 0])].dropna()
 
-        if os.path.exists(learn_date_file):
-            with open(learn_date_file, "r") as f:
-                last_learn = datetime.strptime(
-                    json.load(f)["date"], "%Y-%m-%d"
-                ).date()
-            if (date.today() - last_learn).days < 7:
-                learn_flag = False
 
-        # ==================================================
-        # WEEKLY LEARNING
-        # ==================================================
-        if learn_flag:
-            print("  🔁 Weekly learning")
-
-            df = yf.download(
-                yahoo_symbol,
-                period=LEARN_LOOKBACK_YEARS,
-                interval="1d",
-                progress=False
-            )
-
-            if df is None or df.empty or len(df) < MIN_ROWS:
-                print("  ⚠️ Insufficient data for learning, skipping learning")
-                atr_multiplier = DEFAULT_ATR_MULTIPLIER
-            else:
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = df.columns.get_level_values(0)
-
-                df["HL"] = df["High"] - df["Low"]
-                df["HPC"] = (df["High"] - df["Close"].shift(1)).abs()
-                df["LPC"] = (df["Low"] - df["Close"].shift(1)).abs()
-                df["TR"] = df[["HL", "HPC", "LPC"]].max(axis=1)
-                df["ATR"] = df["TR"].rolling(ATR_WINDOW).mean()
-                df = df.dropna()
-
-                best_r = -999
-                best_m = DEFAULT_ATR_MULTIPLIER
-
-                for m in [1.0, 1.2, 1.5, 1.8, 2.0]:
-                    r_vals = []
-
-                    for i in range(1, len(df)):
-                        entry = df.iloc[i - 1]["Close"]
-                        atr = df.iloc[i]["ATR"]
-                        risk = atr * m
-
-                        if risk <= 0:
-                            continue
-
-                        pnl = df.iloc[i]["Close"] - entry
-                        r_vals.append(pnl / risk)
-
-                    if r_vals:
-                        avg_r = sum(r_vals) / len(r_vals)
-                        if avg_r > best_r:
-                            best_r = avg_r
-                            best_m = m
-
-                atr_multiplier = round(best_m, 2)
-
-                with open(f"{LEARN_DIR}/{symbol}.json", "w") as f:
-                    json.dump(
-                        {
-                            "best_atr_multiplier": atr_multiplier,
-                            "average_r": round(best_r, 4)
-                        },
-                        f,
-                        indent=4
-                    )
-
-                with open(learn_date_file, "w") as f:
-                    json.dump({"date": TODAY}, f)
-
-                print(f"  ✅ Learned ATR multiplier: {atr_multiplier}")
+# ======================================================
+# FETCH (BATCHED DOWNLOADS)
+# ======================================================
+def learn_due(symbol):
+    # Weekly learning check
+    if symbol not in learn_dates:
+        return True
+    last_learn = datetime.strptime(learn_dates[symbol], "%Y-%m-%d").date()
+    return (date.today() - last_learn).days >= 7
+
+
+def split_batch(raw, yahoo_symbol):
+    # A multi-ticker download returns (field, ticker) columns
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return raw
+
+    if yahoo_symbol not in raw.columns.get_level_values(1):
+        return raw.iloc[0:0]
+
+    return raw.xs(yahoo_symbol, axis=1, level=1).dropna(how="all")
+
+
+def prepare(df, learn_flag):
+    # Learning days fetch the 3y window once; trailing uses its last
+    # ATR_LOOKBACK_DAYS slice and the same ATR series.
+    rows = len(df)
+    trailing_rows = 0
+
+    if rows:
+        cutoff = df.index.max() - pd.Timedelta(days=ATR_LOOKBACK_DAYS)
+        trailing_rows = int((df.index >= cutoff).sum())
+        df = add_atr(df)
+
+    return {
+        "df": df,
+        "learn": learn_flag,
+        "rows": rows,
+        "trailing_rows": trailing_rows
+    }
+
+
+tasks = [
+    (str(row["symbol"]).strip(), SYMBOL_OVERRIDES.get(str(row["symbol"]).strip(), row["yahoo_symbol"]))
+    for _, row in universe.iterrows()
+]
+
+# One download per FETCH_BATCH_SIZE symbols sharing a lookback window,
+# one after the other: yf.download keeps its results in module globals,
+# so concurrent calls can mix up frames
+windows = {}
+for symbol, yahoo_symbol in tasks:
+    learn_flag = learn_due(symbol)
+    windows.setdefault(learn_flag, []).append((symbol, yahoo_symbol))
+
+fetched = {}
+
+for learn_flag, pairs in windows.items():
+    period = LEARN_LOOKBACK_YEARS if learn_flag else f"{ATR_LOOKBACK_DAYS}d"
+
+    for start in range(0, len(pairs), FETCH_BATCH_SIZE):
+        chunk = pairs[start:start + FETCH_BATCH_SIZE]
+        print(f"\n▶ Fetching batch {start // FETCH_BATCH_SIZE + 1}: {len(chunk)} symbols ({period})")
+
+        try:
+            raw = data.download([yahoo_symbol for _, yahoo_symbol in chunk], period=period, interval="1d")
+        except Exception as e:
+            for symbol, _ in chunk:
+                print(f"  ❌ Error fetching {symbol}: {e}")
+                data.fail(symbol, e)
+            continue
+
+        for symbol, yahoo_symbol in chunk:
+            try:
+                fetched[symbol] = prepare(split_batch(raw, yahoo_symbol), learn_flag)
+            except Exception as e:
+                print(f"  ❌ Error fetching {symbol}: {e}")
+                data.fail(symbol, e)
+
+# Universe order for the passes below
+prepared = {symbol: fetched[symbol] for symbol, _ in tasks if symbol in fetched}
 
+# ======================================================
+# WEEKLY LEARNING (ALL SYMBOLS IN ONE BROADCAST)
+# ======================================================
+learners = [s for s, p in prepared.items() if p["learn"]]
+ready = [s for s in learners if prepared[s]["rows"] >= MIN_ROWS]
+
+print(f"\n🔁 Weekly learning: {len(ready)} symbols")
+
+for symbol in learners:
+    if symbol not in ready:
+        print(f"  ⚠️ {symbol}: insufficient data for learning, skipping learning")
+
+if ready:
+    best_m, best_r = optimize_multipliers(
+        stack_series([prepared[s]["df"]["Close"].to_numpy() for s in ready]),
+        stack_series([prepared[s]["df"]["ATR"].to_numpy() for s in ready]),
+        grid=ATR_MULTIPLIER_GRID,
+        default=DEFAULT_ATR_MULTIPLIER
+    )
+
+    for symbol, m, r in zip(ready, best_m, best_r):
+        atr_multiplier = round(float(m), 2)
+
+        store.set_learned(symbol, atr_multiplier, round(float(r), 4), TODAY)
+        learned[symbol] = atr_multiplier
+
+        print(f"  ✅ {symbol}: learned ATR multiplier {atr_multiplier}")
+
+# ======================================================
+# DAILY TRAILING LOOP
+# ======================================================
+for symbol, p in prepared.items():
+    df = p["df"]
+
+    print(f"\nTrailing {symbol}")
+
+    try:
         # ==================================================
         # LOAD LEARNED MULTIPLIER
         # ==================================================
-        learn_file = f"{LEARN_DIR}/{symbol}.json"
-        if os.path.exists(learn_file):
-            with open(learn_file, "r") as f:
-                atr_multiplier = float(json.load(f)["best_atr_multiplier"])
-        else:
-            atr_multiplier = DEFAULT_ATR_MULTIPLIER
+        atr_multiplier = float(learned.get(symbol, DEFAULT_ATR_MULTIPLIER))
 
         # ==================================================
         # DAILY TRAILING
         # ==================================================
-        df = yf.download(
-            yahoo_symbol,
-            period=f"{ATR_LOOKBACK_DAYS}d",
-            interval="1d",
-            progress=False
-        )
-
-        if df is None or df.empty or len(df) < MIN_ROWS:
+        if p["trailing_rows"] < MIN_ROWS:
             print("  ⚠️ No sufficient daily data, skipping")
+            data.fail(symbol, "insufficient daily data")
             continue
 
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-
-        df["HL"] = df["High"] - df["Low"]
-        df["HPC"] = (df["High"] - df["Close"].shift(1)).abs()
-        df["LPC"] = (df["Low"] - df["Close"].shift(1)).abs()
-        df["TR"] = df[["HL", "HPC", "LPC"]].max(axis=1)
-        df["ATR"] = df["TR"].rolling(ATR_WINDOW).mean()
-        df = df.dropna()
-
         close_price = round(float(df.iloc[-1]["Close"]), 2)
         atr = round(float(df.iloc[-1]["ATR"]), 2)
 
         new_sl = round(close_price - (atr * atr_multiplier), 2)
 
         # ==================================================
-        # READ PREVIOUS STOPLOSS (SAFE)
+        # RATCHET AGAINST PREVIOUS STOPLOSS (IN MEMORY)
         # ==================================================
-        file_path = f"{DATA_DIR}/{symbol}.csv"
-
-        if os.path.exists(file_path):
-            try:
-                old = pd.read_csv(file_path)
-                if "stoploss" in old.columns and len(old) > 0:
-                    prev_sl = float(old.iloc[-1]["stoploss"])
-                    new_sl = max(prev_sl, new_sl)
-            except Exception:
-                print("  ⚠️ Corrupt CSV detected, resetting")
+        if symbol in last_stoploss:
+            new_sl = max(last_stoploss[symbol], new_sl)
 
         # ==================================================
         # SAVE DATA
         # ==================================================
-        out = pd.DataFrame([{
+        store.append_stoploss(symbol, {
             "date": TODAY,
             "close_price": close_price,
             "atr": atr,
             "atr_multiplier": atr_multiplier,
             "stoploss": new_sl
-        }])
-
-        if os.path.exists(file_path):
-            out.to_csv(file_path, mode="a", header=False, index=False)
-        else:
-            out.to_csv(file_path, index=False)
+        })
+        last_stoploss[symbol] = new_sl
 
         print(f"  ✅ Close: {close_price} | SL: {new_sl}")
 
     except Exception as e:
         print(f"  ❌ Error processing {symbol}: {e}")
+        data.fail(symbol, e)
+
+# ======================================================
+# COMMIT STATE (ONE TRANSACTION PER RUN)
+# ======================================================
+store.commit()
+store.close()
 
 # ======================================================
 # SAVE DAILY LOCK
@@ -231,4 +281,6 @@ for idx, row in universe.iterrows():
 with open(LOCK_FILE, "w") as f:
     json.dump({"date": TODAY}, f)
 
+data.save_report()
+
 print("\nSTEP 11 COMPLETED — SYSTEM RUN SUCCESSFULLY")
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import numpy as np
+import pytest
+
+# tools/ modules import each other by bare name; same bootstrap as run.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+
+@pytest.fixture
+def make_panel(tmp_path, monkeypatch):
+    # make_panel(values, symbols, dates, fields) -> Panel over a memmap
+    # written under tmp_path (values: symbols x dates x fields, NaN = no bar)
+    import panel
+
+    monkeypatch.setattr(panel, "PANEL_DIR", str(tmp_path / "panel"))
+
+    def make(values, symbols, dates, fields, kind="features"):
+        out = panel.panel_dir(kind)
+        os.makedirs(out, exist_ok=True)
+
+        values = np.ascontiguousarray(values, dtype=panel.PANEL_DTYPE)
+        values.tofile(os.path.join(out, "values-test.bin"))
+
+        with open(os.path.join(out, "meta.json"), "w") as f:
+            json.dump({
+                "kind": kind,
+                "values_file": "values-test.bin",
+                "dtype": panel.PANEL_DTYPE,
+                "shape": list(values.shape),
+                "symbols": list(symbols),
+                "dates": [str(d)[:10] for d in dates],
+                "fields": list(fields)
+            }, f)
+
+        return panel.Panel(kind)
+
+    return make
+
+
+@pytest.fixture
+def open_store(tmp_path, monkeypatch):
+    # open_store() -> SignalStore on a database under tmp_path; workbooks are
+    # imported from tmp_path/reports, not from the repo
+    import signal_store
+
+    monkeypatch.setattr(signal_store, "REPORT_DIR", str(tmp_path / "reports"))
+
+    def open_(name="signals.db"):
+        return signal_store.SignalStore(str(tmp_path / name))
+
+    return open_
@@ -0,0 +1,68 @@
+import numpy as np
+from atr_learning import DEFAULT_GRID, optimize_multipliers, stack_series
+
+
+def random_walks(n, seed=7):
+    # ragged close / ATR histories (already dropna'd, as run.py passes them),
+    # some too short to score and some with zero-ATR bars
+    rng = np.random.default_rng(seed)
+    closes, atrs = [], []
+    for i in range(n):
+        days = int(rng.integers(1, 160))
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, days)))
+        atr = close * rng.uniform(0.01, 0.04, days)
+        if i % 5 == 0:
+            atr[rng.integers(0, days, 3)] = 0.0
+        closes.append(close)
+        atrs.append(atr)
+    return closes, atrs
+
+
+def baseline_loop(close, atr, grid, default=1.5):
+    # the per-row loop run.py used before the optimizer
+    best_r = -999
+    best_m = default
+
+    for m in grid:
+        r_vals = []
+
+        for i in range(1, len(close)):
+            entry = close[i - 1]
+            risk = atr[i] * m
+
+            if risk <= 0:
+                continue
+
+            pnl = close[i] - entry
+            r_vals.append(pnl / risk)
+
+        if r_vals:
+            avg_r = sum(r_vals) / len(r_vals)
+            if avg_r > best_r:
+                best_r = avg_r
+                best_m = m
+
+    return round(best_m, 2), round(best_r, 4)
+
+
+def assert_matches_baseline(grid, seed):
+    closes, atrs = random_walks(200, seed)
+    best_m, best_r = optimize_multipliers(stack_series(closes), stack_series(atrs), grid=grid, default=1.5)
+
+    for close, atr, m, r in zip(closes, atrs, best_m, best_r):
+        assert (round(float(m), 2), round(float(r), 4)) == baseline_loop(close, atr, grid)
+
+
+def test_matches_baseline_loop_on_the_default_grid():
+    assert_matches_baseline(DEFAULT_GRID, seed=7)
+
+
+def test_matches_baseline_loop_on_a_fine_grid():
+    assert_matches_baseline([round(0.5 + 0.05 * i, 2) for i in range(51)], seed=11)
+
+
+def test_non_positive_multipliers_are_never_chosen():
+    closes, atrs = random_walks(10, seed=3)
+    best_m, _ = optimize_multipliers(stack_series(closes), stack_series(atrs), grid=[0.0, -1.0, 1.2])
+
+    assert set(best_m) <= {1.2, 1.5}
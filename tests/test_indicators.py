@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import (
+    compact, compute_universe, ema, load_state, rolling_mean, save_state,
+    take_state, uncompact, update_universe
+)
+
+
+# ===============================
+# PANDAS REFERENCE (per symbol, as compute_features did it)
+# ===============================
+def pandas_features(df):
+    close, high, low = df["close"], df["high"], df["low"]
+
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).rolling(14).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(14).mean()
+
+    tr = pd.concat([
+        high - low,
+        (high - close.shift()).abs(),
+        (low - close.shift()).abs()
+    ], axis=1).max(axis=1)
+
+    out = pd.DataFrame({
+        "ema_20": close.ewm(span=20, adjust=False).mean(),
+        "ema_50": close.ewm(span=50, adjust=False).mean(),
+        "ema_200": close.ewm(span=200, adjust=False).mean(),
+        "rsi_14": 100 - (100 / (1 + avg_gain / avg_loss)),
+        "atr_14": tr.rolling(14).mean()
+    })
+    out["trend"] = np.where(
+        (out.ema_20 > out.ema_50) & (out.ema_50 > out.ema_200), "UP",
+        np.where((out.ema_20 < out.ema_50) & (out.ema_50 < out.ema_200), "DOWN", "SIDEWAYS")
+    )
+    return out
+
+
+def ragged_frames(seed=1):
+    # symbols of very different lengths (some shorter than every window),
+    # NaN gaps, flat runs and a negative-free / all-equal stretch
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for i, n in enumerate([0, 1, 5, 13, 14, 15, 60, 230, 400]):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        spread = close * rng.uniform(0.005, 0.03, n)
+        high, low = close + spread, close - spread
+
+        if n > 40:
+            close[10:13] = np.nan                # gap in close only
+            high[20], low[20] = np.nan, np.nan   # gap in high/low only
+            close[30:38] = close[29]             # flat run
+
+        frames[f"S{i}"] = pd.DataFrame({"close": close, "high": high, "low": low})
+    return frames
+
+
+def assert_same(actual, expected):
+    np.testing.assert_array_equal(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float))
+
+
+# ===============================
+# LAYOUT
+# ===============================
+def test_compact_right_aligns_and_uncompact_inverts():
+    frames = ragged_frames()
+    values = compact(frames, "close")
+    lengths = [len(df) for df in frames.values()]
+
+    assert values.shape == (max(lengths), len(frames))
+    for j, n in enumerate(lengths):
+        assert np.isnan(values[:values.shape[0] - n, j]).all()
+
+    for back, df in zip(uncompact(values, lengths), frames.values()):
+        assert_same(back, df["close"])
+
+
+# ===============================
+# RECURRENCES
+# ===============================
+@pytest.mark.parametrize("span", [20, 50, 200])
+def test_ema_matches_pandas_ewm(span):
+    frames = ragged_frames()
+    values = compact(frames, "close")
+    lengths = [len(df) for df in frames.values()]
+
+    for out, df in zip(uncompact(ema(values, span), lengths), frames.values()):
+        assert_same(out, df["close"].ewm(span=span, adjust=False).mean())
+
+
+@pytest.mark.parametrize("window", [1, 3, 14])
+def test_rolling_mean_matches_pandas_rolling(window):
+    frames = ragged_frames()
+    values = compact(frames, "close")
+    lengths = [len(df) for df in frames.values()]
+
+    for out, df in zip(uncompact(rolling_mean(values, window), lengths), frames.values()):
+        assert_same(out, df["close"].rolling(window).mean())
+
+
+def test_rolling_mean_of_signed_values_matches_pandas():
+    # sign clamping: all-positive / all-negative windows never flip sign
+    rng = np.random.default_rng(5)
+    x = np.concatenate([rng.uniform(1e-9, 1e-8, 30), -rng.uniform(1e-9, 1e-8, 30), rng.normal(0, 1e6, 30)])
+    out = rolling_mean(x[:, None], 7)[:, 0]
+    assert_same(out, pd.Series(x).rolling(7).mean())
+
+
+# ===============================
+# FEATURES
+# ===============================
+def test_universe_features_match_pandas_per_symbol():
+    frames = ragged_frames()
+    features, _ = compute_universe(frames)
+
+    assert list(features) == list(frames)
+    for symbol, df in frames.items():
+        expected = pandas_features(df)
+        for col in ["ema_20", "ema_50", "ema_200", "rsi_14", "atr_14"]:
+            assert_same(features[symbol][col], expected[col])
+        assert list(features[symbol]["trend"]) == list(expected["trend"])
+
+
+# ===============================
+# INCREMENTAL UPDATES
+# ===============================
+FEATURE_COLUMNS = ["ema_20", "ema_50", "ema_200", "rsi_14", "atr_14"]
+
+
+def assert_same_features(actual, expected):
+    for col in FEATURE_COLUMNS:
+        assert_same(actual[col], expected[col])
+    assert list(actual["trend"]) == list(expected["trend"])
+
+
+def split_runs(frames, cuts):
+    # frames cut into consecutive runs at the given bar counts per symbol
+    runs = []
+    start = {s: 0 for s in frames}
+    for cut in cuts + [None]:
+        run = {}
+        for s, df in frames.items():
+            end = len(df) if cut is None else min(cut[s], len(df))
+            run[s] = df.iloc[start[s]:end].reset_index(drop=True)
+            start[s] = max(start[s], end)
+        runs.append(run)
+    return runs
+
+
+def test_incremental_updates_match_full_recompute(tmp_path):
+    frames = {s: df for s, df in ragged_frames(seed=3).items() if len(df)}
+    full, _ = compute_universe(frames)
+
+    # every symbol gains a different number of bars per run (including none),
+    # with cuts inside NaN gaps and inside the first windows
+    lengths = {s: len(df) for s, df in frames.items()}
+    cuts = [
+        {s: n - k for (s, n), k in zip(lengths.items(), [0, 1, 3, 4, 9, 30, 188, 390])},
+        {s: n - k for (s, n), k in zip(lengths.items(), [0, 0, 2, 1, 3, 21, 171, 388])},
+        {s: n - k for (s, n), k in zip(lengths.items(), [0, 0, 0, 0, 1, 7, 40, 120])},
+    ]
+    first, *updates = split_runs(frames, cuts)
+
+    start = {s: df for s, df in first.items() if len(df)}
+    features, state = compute_universe(start)
+    symbols = list(start)
+    parts = {s: [df] for s, df in features.items()}
+
+    for run in updates:
+        # state goes through state/indicator_state.npz between runs
+        path = str(tmp_path / "indicator_state.npz")
+        save_state(path, symbols, [np.datetime64("2024-01-01")] * len(symbols), state)
+        _, _, state, _ = load_state(path)
+
+        appended = update_universe({s: run[s] for s in symbols}, state)
+        for s, df in appended.items():
+            parts[s].append(df)
+
+    for s in symbols:
+        assert_same_features(pd.concat(parts[s], ignore_index=True), full[s])
+
+
+def test_update_of_a_subset_of_symbols_matches_full_recompute():
+    # compute_features advances only the symbols that have new bars
+    frames = {s: df for s, df in ragged_frames(seed=4).items() if len(df) > 20}
+    head = {s: df.iloc[:-5].reset_index(drop=True) for s, df in frames.items()}
+    _, state = compute_universe(head)
+
+    symbols = list(frames)
+    idx = [0, 2]
+    part = take_state(state, idx)
+
+    appended = update_universe({symbols[i]: frames[symbols[i]].iloc[-5:].reset_index(drop=True) for i in idx}, part)
+    full, _ = compute_universe({symbols[i]: frames[symbols[i]] for i in idx})
+
+    for i in idx:
+        assert_same_features(appended[symbols[i]], full[symbols[i]].iloc[-5:].reset_index(drop=True))
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from pytest import approx
+from panel import TREND_CODES
+from portfolio_backtest import RULES, prepare, run_backtest, weekly_picks
+
+# Mon 1 - Fri 5, Mon 8 - Thu 11 (Friday holiday), Mon 15 - Fri 19:
+# rebalances on days 4, 8 and 13
+DATES = pd.DatetimeIndex(
+    list(pd.bdate_range("2024-01-01", "2024-01-11")) + list(pd.bdate_range("2024-01-15", "2024-01-19"))
+)
+COST = 0.001
+
+
+def hand_data():
+    # A: bought at 100 on day 4, rising, sold at the day 8 rebalance (108)
+    # B: bought at 50 on day 4, stop 50 - 1.5 * 2 = 47 -> 48, closes 47 on day 6
+    # C: bought at 20 on day 8, held 5 bars to 25 on day 13
+    # D: cut by top_n on day 4, no UP streak on day 8
+    close = np.array([
+        [100] * 5 + [102, 104, 106, 108] + [108] * 5,
+        [50] * 5 + [51, 47] + [47] * 7,
+        [20] * 9 + [21, 22, 23, 24, 25],
+        [10] * 14
+    ], dtype=float)
+    atr = np.array([[1.0], [2.0], [0.5], [0.1]]) * np.ones((1, 14))
+    up3 = np.ones((4, 14), dtype=bool)
+    up3[3, 8] = False
+
+    # day 0: one resolved win per symbol (matured on day 1), so every symbol
+    # has a win rate of 1 from day 1 on
+    sym = np.array([0, 1, 2, 3, 0, 1, 3, 2, 3, 0])
+    day = np.array([0, 0, 0, 0, 4, 4, 4, 8, 8, 8])
+    score = np.array([60, 60, 60, 60, 90, 80, 71, 75, 95, 65], dtype=float)
+    matured = np.arange(10) < 4
+
+    return {
+        "dates": DATES,
+        "symbols": ["A", "B", "C", "D"],
+        "close": close,
+        "atr": atr,
+        "up3": up3,
+        "rules": dict(RULES),
+        "signal_sym": sym,
+        "signal_day": day,
+        "signal_score": score,
+        "signal_rsi": np.full(10, 55.0),
+        "signal_atr_pct": np.full(10, 0.02),
+        "signal_matured": matured,
+        "signal_exit": np.where(matured, 1, -1),
+        "signal_win": matured.copy(),
+        "rebalance": np.array([4, 8, 13])
+    }
+
+
+PARAMS = {"top_n": 2, "min_score": 70.0, "min_win_rate": 0.5, "hold_bars": 5, "cost_bps": 10.0}
+
+
+def test_weekly_picks_take_the_best_top_n_with_an_up_streak():
+    cohort, sym, day = weekly_picks(hand_data(), {**RULES, **PARAMS})
+
+    # day 4: A (90) and B (80) beat D (71); day 8: D has no streak, A scores 65
+    assert cohort.tolist() == [0, 0, 1]
+    assert sym.tolist() == [0, 1, 2]
+    assert day.tolist() == [4, 4, 8]
+
+
+def test_run_backtest_hand_computed():
+    summary, curve, trades = run_backtest(hand_data(), **PARAMS)
+    c = 1 - COST
+
+    assert trades["symbol"].tolist() == ["A", "B", "C"]
+    assert trades["exit"].tolist() == ["REBALANCE", "STOP", "HOLD"]
+    assert trades["exit_date"].tolist() == [DATES[8], DATES[6], DATES[13]]
+    assert trades["exit_price"].tolist() == [108, 47, 25]
+    assert trades["weight"].tolist() == [0.5, 0.5, 0.5]
+    assert trades["return"].to_numpy() == approx([1.08 * c * c - 1, 0.94 * c * c - 1, 1.25 * c * c - 1])
+
+    # week 1 fully invested, week 2 half in C and half in cash
+    week_1 = 0.5 * 1.08 * c * c + 0.5 * 0.94 * c * c
+    week_2 = 0.5 + 0.5 * 1.25 * c * c
+    expected = [
+        c,                                           # day 4: both bought
+        0.5 * 1.02 * c + 0.5 * 1.02 * c,
+        0.5 * 1.04 * c + 0.5 * 0.94 * c * c,         # day 6: B stopped out
+        0.5 * 1.06 * c + 0.5 * 0.94 * c * c,
+        week_1 * (0.5 + 0.5 * c),                    # day 8: A sold, C bought
+        week_1 * (0.5 + 0.5 * 1.05 * c),
+        week_1 * (0.5 + 0.5 * 1.10 * c),
+        week_1 * (0.5 + 0.5 * 1.15 * c),
+        week_1 * (0.5 + 0.5 * 1.20 * c),
+        week_1 * week_2                              # day 13: C sold
+    ]
+    assert curve["date"].tolist() == list(DATES[4:])
+    assert curve["equity"].to_numpy() == approx(expected)
+    assert summary["total_return"] == approx(week_1 * week_2 / c - 1)
+
+    # turnover: (bought + sold) / (2 * equity) on each trading day
+    traded = np.zeros(10)
+    traded[0] = 1.0
+    traded[2] = 0.5 * 0.94
+    traded[4] = 0.5 * 1.08 + week_1 * 0.5
+    traded[9] = week_1 * 0.5 * 1.25
+    assert curve["turnover"].to_numpy() == approx(traded / (2 * np.array(expected)))
+
+    assert summary["trades"] == 3
+    assert summary["weeks"] == 3
+    assert summary["stop_exits"] == approx(1 / 3)
+    assert summary["win_rate"] == approx(2 / 3)
+    assert summary["avg_exposure"] == approx(0.5)
+    assert summary["start"] == "2024-01-05"
+    assert summary["end"] == "2024-01-19"
+
+
+def test_costs_are_charged_on_both_sides():
+    free, _, free_trades = run_backtest(hand_data(), **{**PARAMS, "cost_bps": 0.0})
+    paid, _, _ = run_backtest(hand_data(), **PARAMS)
+
+    assert free_trades["return"].to_numpy() == approx([0.08, -0.06, 0.25])
+    assert free["total_return"] == approx((0.5 * 1.08 + 0.5 * 0.94) * (0.5 + 0.5 * 1.25) - 1)
+    assert paid["total_return"] < free["total_return"]
+
+
+def test_up_streak_counts_complete_rows(make_panel):
+    # A misses day 3 and has a NaN rsi on day 5: its complete rows are days
+    # 0 1 2 4 6 7. B is complete but SIDEWAYS on day 4
+    fields = ["close", "ema_20", "ema_50", "ema_200", "rsi_14", "atr_14", "trend"]
+    values = np.ones((2, 8, len(fields)))
+    values[:, :, fields.index("trend")] = TREND_CODES["UP"]
+    values[0, 3] = np.nan
+    values[0, 5, fields.index("rsi_14")] = np.nan
+    values[1, 4, fields.index("trend")] = TREND_CODES["SIDEWAYS"]
+
+    data = prepare(make_panel(values, ["A", "B"], pd.bdate_range("2024-01-01", periods=8), fields))
+
+    assert np.flatnonzero(data["up3"][0]).tolist() == [2, 4, 6, 7]
+    assert np.flatnonzero(data["up3"][1]).tolist() == [2, 3, 7]
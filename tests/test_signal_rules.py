@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from signal_rules import forward_bars, forward_closes, resolve_pending
+
+DATES = pd.bdate_range("2024-01-01", periods=10)
+
+
+def close_panel(make_panel):
+    # A trades every date, B has no bars on dates 2, 3 and 6, C lists on date 4
+    close = np.full((3, 10), np.nan)
+    close[0] = 100 + np.arange(10)
+    close[1] = 200 + np.arange(10)
+    close[1, [2, 3, 6]] = np.nan
+    close[2, 4:] = 300 + np.arange(6)
+    return make_panel(close[:, :, None], ["A", "B", "C"], DATES, ["close"])
+
+
+def test_forward_bars_count_each_symbols_own_bars(make_panel):
+    panel = close_panel(make_panel)
+    symbols = ["A", "B", "B", "B", "C", "C", "X", "A"]
+    bar_dates = [DATES[1], DATES[1], DATES[2], DATES[8], DATES[2], DATES[4], DATES[1],
+                 pd.Timestamp("2023-12-29")]
+
+    entry, exit_ = forward_bars(panel, symbols, bar_dates, horizon=3)
+
+    # B's bars: 0 1 4 5 7 8 9 -> from 1, three bars later is 7; a signal on
+    # date 2 (no bar) enters on the last bar before it
+    assert entry.tolist() == [1, 1, 1, 8, -1, 4, -1, -1]
+    assert exit_.tolist() == [4, 7, 7, -1, -1, 7, -1, -1]
+
+
+def test_forward_closes_nan_where_not_available(make_panel):
+    panel = close_panel(make_panel)
+
+    entry, exit_ = forward_closes(panel, ["A", "B", "C", "X"], [DATES[1], DATES[2], DATES[2], DATES[1]], horizon=3)
+
+    np.testing.assert_array_equal(entry, [101, 201, np.nan, np.nan])
+    np.testing.assert_array_equal(exit_, [104, 207, np.nan, np.nan])
+
+
+def test_resolve_pending_fills_matured_signals_only(make_panel, open_store):
+    panel = close_panel(make_panel)
+    store = open_store()
+
+    records = [
+        {"date": DATES[1], "bar_date": DATES[1], "symbol": "B", "signal_score": 70.0,
+         "rsi": 50.0, "atr": 1.0, "trend": "UP"},
+        {"date": DATES[8], "bar_date": DATES[8], "symbol": "A", "signal_score": 80.0,
+         "rsi": 50.0, "atr": 1.0, "trend": "UP"}
+    ]
+    store.append_signals(records)
+    store.queue_pending(records)
+
+    assert resolve_pending(store, panel, horizon=3) == 1
+
+    df = store.signals()
+    assert df["forward_return_5d"].iloc[0] == (207 - 201) / 201
+    assert bool(df["win"].iloc[0]) is True
+    assert pd.isna(df["forward_return_5d"].iloc[1])
+    assert store.pending_count() == 1
+    store.close()
@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import pandas as pd
+from signal_rules import resolve_pending
+
+DATES = pd.bdate_range("2024-01-01", periods=10)
+
+
+def legacy_log():
+    # signal_log.xlsx rows as the old pipeline wrote them: forward_return_5d
+    # / win looked 5 bars back
+    return pd.DataFrame({
+        "date": [DATES[1].date(), DATES[2].date(), DATES[8].date()],
+        "symbol": ["A", "A", "A"],
+        "signal_score": [72.0, 81.0, 65.0],
+        "forward_return_5d": [-0.5, 0.25, 0.1],
+        "win": [False, True, True],
+        "rsi": [50.0, 55.0, 60.0],
+        "atr": [1.0, 1.1, 1.2],
+        "trend": ["UP", "UP", "UP"]
+    })
+
+
+# ===============================
+# MIGRATION
+# ===============================
+def test_migrated_signals_are_queued_and_resolved_forward(tmp_path, open_store, make_panel):
+    os.makedirs(tmp_path / "reports")
+    legacy_log().to_excel(tmp_path / "reports" / "signal_log.xlsx", index=False)
+
+    store = open_store()
+    assert store.signals()["forward_return_5d"].isna().all()
+    assert store.signals(resolved=True).empty
+    assert store.pending_count() == 3
+    assert store.aggregates("symbol").empty
+
+    close = (100 + np.arange(10, dtype=float))[None, :, None]
+    panel = make_panel(close, ["A"], DATES, ["close"])
+    assert resolve_pending(store, panel, horizon=5) == 2
+
+    df = store.signals(resolved=True)
+    np.testing.assert_allclose(df["forward_return_5d"], [5 / 101, 5 / 102])
+    assert store.aggregates("symbol")["signals"].tolist() == [2]
+    store.close()
+
+
+def test_stores_migrated_with_backward_returns_are_requeued_once(open_store):
+    store = open_store()
+    store.append_signals(legacy_log().to_dict("records"))
+    store.conn.execute("DELETE FROM meta WHERE key = 'legacy_requeued'")
+    store.commit()
+    store.close()
+
+    store = open_store()
+    assert store.signals()["forward_return_5d"].isna().all()
+    assert store.pending_count() == 3
+    store.close()
+
+    # the next open leaves resolved rows alone
+    store = open_store()
+    store.resolve([("A", DATES[1], 0.05)])
+    store.commit()
+    store.close()
+
+    store = open_store()
+    assert store.signals(resolved=True)["forward_return_5d"].tolist() == [0.05]
+    store.close()
+
+
+# ===============================
+# RUNNING AGGREGATES
+# ===============================
+def groupby_aggregates(signals, scope, span, as_of):
+    # Plain recompute over the resolved log, weights anchored at as_of
+    from signal_store import DECAY_HALF_LIFE_DAYS, ROLLING_DAYS, score_bucket
+
+    df = signals.assign(bucket=score_bucket(signals["signal_score"]))
+    age = (as_of - df["date"]).dt.days.to_numpy()
+    weight = {
+        "all": np.ones(len(df)),
+        "rolling": (age < ROLLING_DAYS).astype(float),
+        "decay": 0.5 ** (age / DECAY_HALF_LIFE_DAYS)
+    }[span]
+
+    ret = df["forward_return_5d"].to_numpy()
+    parts = pd.DataFrame({
+        scope: df[scope],
+        "n": weight,
+        "wins": weight * df["win"].to_numpy(dtype=float),
+        "sum_return": weight * ret,
+        "sum_sq_return": weight * ret * ret,
+        "sum_score": weight * df["signal_score"].to_numpy()
+    }).groupby(scope).sum()
+    parts = parts[parts["n"] > 1e-9]
+
+    avg = parts["sum_return"] / parts["n"]
+    return pd.DataFrame({
+        "signals": parts["n"],
+        "win_rate": parts["wins"] / parts["n"],
+        "avg_return": avg,
+        "std_return": np.sqrt((parts["sum_sq_return"] / parts["n"] - avg * avg).clip(lower=0)),
+        "avg_score": parts["sum_score"] / parts["n"]
+    })
+
+
+def test_incremental_aggregates_match_groupby(open_store):
+    rng = np.random.default_rng(2)
+    dates = pd.bdate_range("2023-01-02", periods=300)
+
+    n = 3000
+    log = pd.DataFrame({
+        "date": dates[rng.integers(0, len(dates), n)],
+        "symbol": rng.choice(["A", "B", "C", "D", "E"], n),
+        "signal_score": rng.uniform(50, 95, n).round(1),
+        "rsi": 55.0,
+        "atr": 1.0,
+        "trend": "UP"
+    })
+    # the same (symbol, date) logged twice, as a rerun used to do
+    log = pd.concat([log, log.iloc[:50]], ignore_index=True)
+    log["ret"] = rng.normal(0.002, 0.03, len(log))
+
+    store = open_store()
+    store.append_signals(log.to_dict("records"))
+
+    # resolved in date batches as the daily runs would, with stragglers
+    # resolving after newer signals (rolling expiry + decay rescaling)
+    keys = log.drop_duplicates(["symbol", "date"]).sort_values("date")
+    late = keys.sample(frac=0.1, random_state=1)
+    early = keys.drop(late.index)
+    batches = [early.iloc[i:i + 100] for i in range(0, len(early), 100)] + [late]
+
+    for batch in batches:
+        store.resolve(zip(batch["symbol"], batch["date"], batch["ret"]))
+        store.commit()
+
+    resolved = store.signals(resolved=True)
+    as_of = pd.Timestamp(store.get_meta("aggregates_as_of"))
+    assert as_of == resolved["date"].max()
+
+    for scope in ("symbol", "bucket"):
+        for span in ("all", "rolling", "decay"):
+            expected = groupby_aggregates(resolved, scope, span, as_of)
+            actual = store.aggregates(scope, span).set_index(scope)
+            assert list(actual.index) == list(expected.index)
+            for col in expected.columns:
+                np.testing.assert_allclose(actual[col], expected[col], rtol=1e-9, atol=1e-12)
+
+    # a fresh store bootstraps the same numbers from the resolved log
+    store.conn.execute("DELETE FROM aggregates")
+    store.conn.execute("DELETE FROM meta WHERE key IN ('aggregates', 'aggregates_as_of')")
+    store.commit()
+    store.close()
+
+    store = open_store()
+    for span in ("all", "rolling", "decay"):
+        expected = groupby_aggregates(resolved, "symbol", span, as_of)
+        actual = store.aggregates("symbol", span).set_index("symbol")
+        np.testing.assert_allclose(actual["signals"], expected["signals"], rtol=1e-9)
+    store.close()
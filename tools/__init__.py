@@ -0,0 +1,15 @@
+import os
+import sys
+
+# ===============================
+# PATH BOOTSTRAP
+# ===============================
+# The tools are scripts that import each other by bare module name
+# (from panel import ...), which resolves because a script's own directory
+# is sys.path[0]. Importing them as a package (import tools.panel from the
+# repo root) puts that directory on the path first, the way run.py and
+# dashboard.py do.
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if TOOLS_DIR not in sys.path:
+    sys.path.insert(0, TOOLS_DIR)
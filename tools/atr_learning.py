@@ -0,0 +1,59 @@
+import numpy as np
+
+# ===============================
+# ATR MULTIPLIER OPTIMIZER
+# ===============================
+# Scores every candidate multiplier for every symbol at once. The score of a
+# multiplier m is the average R of holding one bar with risk ATR * m:
+#
+#     avg_r(m) = mean((close[i] - close[i-1]) / (atr[i] * m))
+#
+# over the bars with positive risk. m is constant across bars, so this is
+# mean(pnl / atr) / m: one pass over the (symbols x days) arrays gives a
+# per-symbol base score, and a (symbols x grid) broadcast scores the grid.
+
+DEFAULT_GRID = [1.0, 1.2, 1.5, 1.8, 2.0]
+
+
+def stack_series(series_list):
+    # Left-aligns 1-D arrays of different lengths into a NaN-padded
+    # (symbols x days) matrix
+    width = max((len(s) for s in series_list), default=0)
+    out = np.full((len(series_list), width), np.nan)
+
+    for i, s in enumerate(series_list):
+        out[i, :len(s)] = s
+
+    return out
+
+
+def optimize_multipliers(close, atr, grid=DEFAULT_GRID, default=1.5):
+    # close, atr: (symbols x days), NaN padded after each symbol's last bar.
+    # Returns (best_multiplier, average_r) arrays; symbols without a single
+    # scorable bar keep `default` with average_r -999, as the scalar loop did.
+    close = np.asarray(close, dtype=float)
+    atr = np.asarray(atr, dtype=float)
+    grid = np.asarray(grid, dtype=float)
+
+    pnl = close[:, 1:] - close[:, :-1]
+    risk = atr[:, 1:]
+
+    valid = (risk > 0) & ~np.isnan(pnl)
+    count = valid.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base = np.where(valid, pnl / risk, 0.0).sum(axis=1) / count
+        scores = base[:, None] / grid[None, :]
+
+    # risk = atr * m <= 0 for non-positive multipliers: never scorable
+    scores[:, grid <= 0] = -np.inf
+    scores[count == 0, :] = -np.inf
+
+    best = np.argmax(scores, axis=1)
+    best_r = scores[np.arange(len(best)), best]
+
+    found = np.isfinite(best_r)
+    best_m = np.where(found, grid[best], default)
+    best_r = np.where(found, best_r, -999)
+
+    return best_m, best_r
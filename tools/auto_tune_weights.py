@@ -2,6 +2,8 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from signal_store import SignalStore
+from report_writer import ReportWriter
 
 # ===============================
 # PATHS
@@ -9,18 +11,19 @@ from datetime import datetime
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
 REPORT_DIR = os.path.join(BASE_DIR, "reports")
 
-SIGNAL_LOG = os.path.join(REPORT_DIR, "signal_log.xlsx")
 WEIGHT_FILE = os.path.join(REPORT_DIR, "learned_weights.xlsx")
 
 # ===============================
 # LOAD DATA
 # ===============================
-df = pd.read_excel(SIGNAL_LOG)
+store = SignalStore()
 
-# Use last 90 days for learning
-df["date"] = pd.to_datetime(df["date"])
-cutoff = df["date"].max() - pd.Timedelta(days=90)
-df = df[df["date"] >= cutoff]
+# Use last 90 days for learning (only that range is read), resolved
+# signals only
+latest = store.latest_date()
+start = latest - pd.Timedelta(days=90) if latest is not None else None
+df = store.signals(start=start, resolved=True)
+store.close()
 
 if len(df) < 200:
     print("⚠️ Not enough data to tune weights")
@@ -82,7 +85,8 @@ if os.path.exists(WEIGHT_FILE):
     old = pd.read_excel(WEIGHT_FILE)
     out = pd.concat([old, out], ignore_index=True)
 
-out.to_excel(WEIGHT_FILE, index=False)
+with ReportWriter(WEIGHT_FILE) as report:
+    report.write_frame("Sheet1", out)
 
 print("🧠 MODEL WEIGHTS UPDATED")
 print(out.tail(1))
@@ -0,0 +1,62 @@
+import sys
+import pandas as pd
+from panel import open_panel
+from signal_store import SignalStore
+from signal_rules import history_signals, resolve_pending
+
+# ===============================
+# SIGNAL LOG BACKFILL
+# ===============================
+# Replays the daily_learning_metrics filter + score over every historical
+# bar of the feature panel (point in time: each bar only sees the rows up to
+# it) and appends the signals to the signal store, dated by bar. They go
+# through the pending queue like daily signals, so every signal whose
+# horizon has elapsed is resolved right away.
+#
+# Only dates before the first signal already in the log (and before the
+# latest bar, which is the daily stage's) are written, so the command can be
+# rerun safely.
+#
+#   python tools/backfill_signals.py [start] [end]
+
+START = pd.Timestamp(sys.argv[1]) if len(sys.argv) > 1 else None
+END = pd.Timestamp(sys.argv[2]) if len(sys.argv) > 2 else None
+
+panel = open_panel("features")
+store = SignalStore()
+
+cutoffs = [store.earliest_date()] + ([panel.dates.max()] if len(panel.dates) else [])
+cutoffs = [c for c in cutoffs if c is not None]
+cutoff = min(cutoffs) if cutoffs else None
+
+print(f"📜 REPLAYING SIGNAL RULES OVER {len(panel.dates)} DATES x {len(panel.symbols)} STOCKS")
+
+signals = history_signals(panel)
+
+keep = pd.Series(True, index=signals.index)
+if cutoff is not None:
+    keep &= signals["date"] < cutoff
+if START is not None:
+    keep &= signals["date"] >= START
+if END is not None:
+    keep &= signals["date"] <= END
+
+signals = signals[keep]
+
+if signals.empty:
+    store.close()
+    print("✅ Nothing to backfill")
+    exit()
+
+records = signals.to_dict("records")
+store.append_signals(records)
+store.queue_pending(records)
+resolved = resolve_pending(store, panel)
+store.commit()
+pending = store.pending_count()
+store.close()
+
+print("✅ SIGNAL LOG BACKFILLED")
+print(f"📅 DATES   : {signals['date'].min().date()} → {signals['date'].max().date()} ({signals['date'].nunique()})")
+print(f"📈 SIGNALS : {len(signals)}")
+print(f"🎯 RESOLVED: {resolved} ({pending} pending)")
@@ -1,10 +1,10 @@
 import os
 import pandas as pd
-import numpy as np
+from panel import open_panel
+from report_writer import ReportWriter
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
 REPORT_DIR = os.path.join(BASE_DIR, "reports")
-FEATURE_DIR = os.path.join(BASE_DIR, "data", "features")
 
 PICKS_FILE = os.path.join(REPORT_DIR, "weekly_picks.xlsx")
 OUT_FILE = os.path.join(REPORT_DIR, "weekly_backtest.xlsx")
@@ -14,17 +14,17 @@ if not os.path.exists(PICKS_FILE):
     exit()
 
 picks = pd.read_excel(PICKS_FILE)
+panel = open_panel("features")
 
 results = []
 
 for _, row in picks.iterrows():
     symbol = row["symbol"]
-    file = os.path.join(FEATURE_DIR, f"{symbol}.csv")
 
-    if not os.path.exists(file):
+    if symbol not in panel:
         continue
 
-    df = pd.read_csv(file)
+    df = panel.frame(symbol)
     df = df.dropna().reset_index(drop=True)
 
     if len(df) < 10:
@@ -59,9 +59,9 @@ summary = {
 
 summary_df = pd.DataFrame([summary])
 
-with pd.ExcelWriter(OUT_FILE, engine="xlsxwriter") as writer:
-    bt.to_excel(writer, sheet_name="Trades", index=False)
-    summary_df.to_excel(writer, sheet_name="Summary", index=False)
+with ReportWriter(OUT_FILE) as report:
+    report.write_frame("Trades", bt)
+    report.write_frame("Summary", summary_df)
 
 print("📊 WEEKLY BACKTEST COMPLETE")
 print(summary_df)
@@ -1,6 +1,9 @@
 import os
+import numpy as np
 import pandas as pd
-import yfinance as yf
+from price_sources import get_price_source
+from market_data import MarketData
+from columnar_store import append_rows, canonical_columns, ensure_store, write_frames
 
 # ===============================
 # BASE DIRECTORY (DOUBLE market_ai FIX)
@@ -11,73 +14,282 @@ DATA_DIR = os.path.join(BASE_DIR, "data", "prices")
 STATE_DIR = os.path.join(BASE_DIR, "state")
 UNIVERSE_FILE = os.path.join(STATE_DIR, "eligible_stocks_daily.csv")
 
+# ===============================
+# DOWNLOAD MODE
+# ===============================
+# Batched mode fetches BATCH_SIZE tickers per download call instead of
+# one HTTP round trip per symbol.
+BATCH_MODE = True
+BATCH_SIZE = 50
+
+# Incremental mode only fetches the bars after the last stored date_, plus
+# OVERLAP_BARS already stored bars that are re-checked for restatements
+# (splits, dividends changing adj close). A mismatch triggers a full re-pull.
+INCREMENTAL_MODE = True
+OVERLAP_BARS = 5
+RESTATEMENT_RTOL = 1e-6
+
+FULL_PERIOD = "2y"
+
 os.makedirs(DATA_DIR, exist_ok=True)
 
 if not os.path.exists(UNIVERSE_FILE):
     raise FileNotFoundError(f"Universe file not found: {UNIVERSE_FILE}")
 
 stocks = pd.read_csv(UNIVERSE_FILE)
+data = MarketData(get_price_source(), stage="collect_daily_prices")
 
 print(f"📥 COLLECTING DAILY DATA FOR: {len(stocks)} STOCKS")
 
+# Columnar store (market_ai/data/store/prices) is updated alongside the CSVs
+ensure_store("prices")
+store_frames = {}
+store_rows = []
+
 saved = 0
+appended = 0
+up_to_date = 0
+repulled = 0
 skipped = 0
 
 # ===============================
-# MAIN LOOP
+# HELPERS
 # ===============================
-for _, row in stocks.iterrows():
+def clean_symbol(value):
+    # --- FORCE CLEAN STRING ---
+    if isinstance(value, tuple):
+        value = value[0]
+    return str(value).strip()
 
-    symbol = row["symbol"]
-    yahoo_symbol = row["yahoo_symbol"]
 
-    # --- FORCE CLEAN STRING ---
-    if isinstance(symbol, tuple):
-        symbol = symbol[0]
-    if isinstance(yahoo_symbol, tuple):
-        yahoo_symbol = yahoo_symbol[0]
+def flatten(df):
+    df = df.reset_index()
+
+    # 🔥 FIX: HANDLE MULTIINDEX COLUMNS
+    df.columns = [
+        "_".join(c).lower() if isinstance(c, tuple) else c.lower()
+        for c in df.columns
+    ]
+    return df
+
+
+def save_prices(symbol, df):
+    if df.empty or len(df) < 50:
+        print(f"⚠️ {symbol}: insufficient data")
+        data.fail(symbol, "insufficient data")
+        return False
+
+    df = flatten(df)
+    out_file = os.path.join(DATA_DIR, f"{symbol}.csv")
+    df.to_csv(out_file, index=False)
+    store_frames[symbol] = canonical_columns(df)
+
+    print(f"✅ SAVED: {symbol}")
+    return True
+
+
+def split_batch(raw, yahoo_symbol):
+    # A multi-ticker download returns (field, ticker) columns;
+    # keep the ticker level so the flattened names match single downloads.
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return raw
+
+    if yahoo_symbol not in raw.columns.get_level_values(1):
+        return raw.iloc[0:0]
 
-    symbol = str(symbol).strip()
-    yahoo_symbol = str(yahoo_symbol).strip()
+    df = raw.xs(yahoo_symbol, axis=1, level=1, drop_level=False)
+    return df.dropna(how="all")
 
-    print(f"▶ Downloading: {symbol} | {yahoo_symbol}")
+
+def download_frames(pairs, window):
+    # Yields (symbol, df, error) per symbol. window(chunk) returns the
+    # period/start arguments for the download covering that chunk.
+    size = BATCH_SIZE if BATCH_MODE else 1
+
+    for start in range(0, len(pairs), size):
+        chunk = pairs[start:start + size]
+
+        if BATCH_MODE:
+            print(f"▶ Downloading batch {start // size + 1}: {len(chunk)} symbols")
+            tickers = [yahoo_symbol for _, yahoo_symbol in chunk]
+        else:
+            print(f"▶ Downloading: {chunk[0][0]} | {chunk[0][1]}")
+            tickers = chunk[0][1]
+
+        try:
+            raw = data.download(
+                tickers,
+                interval="1d",
+                auto_adjust=False,
+                **window(chunk)
+            )
+        except Exception as e:
+            for symbol, _ in chunk:
+                yield symbol, None, e
+            continue
+
+        for symbol, yahoo_symbol in chunk:
+            try:
+                yield symbol, split_batch(raw, yahoo_symbol), None
+            except Exception as e:
+                yield symbol, None, e
+
+
+def load_existing(symbol):
+    path = os.path.join(DATA_DIR, f"{symbol}.csv")
+
+    if not os.path.exists(path):
+        return None
 
     try:
-        df = yf.download(
-            yahoo_symbol,
-            period="2y",
-            interval="1d",
-            progress=False,
-            auto_adjust=False
+        old = pd.read_csv(path)
+    except Exception:
+        return None
+
+    if "date_" not in old.columns or len(old) < 50:
+        return None
+
+    old["date_"] = pd.to_datetime(old["date_"])
+    return old
+
+
+def apply_delta(symbol, old, df):
+    # Returns "appended", "unchanged" or "mismatch"
+    if df.empty:
+        return "mismatch"
+
+    new = flatten(df)
+    new["date_"] = pd.to_datetime(new["date_"])
+
+    if list(new.columns) != list(old.columns):
+        return "mismatch"
+
+    overlap = old.merge(new, on="date_", suffixes=("_old", "_new"))
+
+    if overlap.empty:
+        return "mismatch"
+
+    for col in old.columns:
+        if col == "date_":
+            continue
+        if not np.allclose(
+            overlap[f"{col}_old"], overlap[f"{col}_new"],
+            rtol=RESTATEMENT_RTOL, equal_nan=True
+        ):
+            return "mismatch"
+
+    new = new[new["date_"] > old["date_"].max()]
+
+    if new.empty:
+        return "unchanged"
+
+    # Batched downloads upcast volume to float; keep the stored dtypes
+    for col in new.columns:
+        if pd.api.types.is_integer_dtype(old[col]) and new[col].notna().all():
+            new[col] = new[col].astype(old[col].dtype)
+
+    new["date_"] = new["date_"].dt.strftime("%Y-%m-%d")
+    out_file = os.path.join(DATA_DIR, f"{symbol}.csv")
+    new.to_csv(out_file, mode="a", header=False, index=False)
+    store_rows.append(canonical_columns(new).assign(symbol=symbol))
+    return "appended"
+
+
+symbols = [
+    (clean_symbol(row["symbol"]), clean_symbol(row["yahoo_symbol"]))
+    for _, row in stocks.iterrows()
+]
+
+# ===============================
+# INCREMENTAL DELTA FETCH
+# ===============================
+full = list(symbols)
+
+if INCREMENTAL_MODE:
+    existing = {}
+    full = []
+
+    for symbol, yahoo_symbol in symbols:
+        old = load_existing(symbol)
+        if old is None:
+            full.append((symbol, yahoo_symbol))
+        else:
+            existing[symbol] = old
+
+    delta = [pair for pair in symbols if pair[0] in existing]
+    lookup = dict(symbols)
+
+    print(f"🔄 INCREMENTAL: {len(delta)} delta | {len(full)} full")
+
+    def delta_window(chunk):
+        start = min(
+            existing[symbol]["date_"].iloc[-OVERLAP_BARS]
+            for symbol, _ in chunk
         )
+        return {"start": start.strftime("%Y-%m-%d")}
 
-        if df.empty or len(df) < 50:
-            print(f"⚠️ {symbol}: insufficient data")
+    for symbol, df, error in download_frames(delta, delta_window):
+        if error is not None:
+            print(f"❌ {symbol}: {error}")
+            data.fail(symbol, error)
             skipped += 1
             continue
 
-        df = df.reset_index()
-
-        # 🔥 FIX: HANDLE MULTIINDEX COLUMNS
-        df.columns = [
-            "_".join(c).lower() if isinstance(c, tuple) else c.lower()
-            for c in df.columns
-        ]
+        try:
+            result = apply_delta(symbol, existing[symbol], df)
+        except Exception as e:
+            print(f"❌ {symbol}: {e}")
+            data.fail(symbol, e)
+            skipped += 1
+            continue
 
-        out_file = os.path.join(DATA_DIR, f"{symbol}.csv")
-        df.to_csv(out_file, index=False)
+        if result == "appended":
+            print(f"✅ APPENDED: {symbol}")
+            appended += 1
+        elif result == "unchanged":
+            up_to_date += 1
+        else:
+            print(f"🔁 {symbol}: overlap mismatch, full re-pull")
+            full.append((symbol, lookup[symbol]))
+            repulled += 1
 
-        print(f"✅ SAVED: {symbol}")
-        saved += 1
+# ===============================
+# FULL DOWNLOAD
+# ===============================
+for symbol, df, error in download_frames(full, lambda chunk: {"period": FULL_PERIOD}):
+    if error is not None:
+        print(f"❌ {symbol}: {error}")
+        data.fail(symbol, error)
+        skipped += 1
+        continue
 
+    try:
+        if save_prices(symbol, df):
+            saved += 1
+        else:
+            skipped += 1
     except Exception as e:
         print(f"❌ {symbol}: {e}")
+        data.fail(symbol, e)
         skipped += 1
 
+# ===============================
+# COLUMNAR STORE
+# ===============================
+write_frames("prices", store_frames)
+if store_rows:
+    append_rows("prices", pd.concat(store_rows, ignore_index=True))
+
 # ===============================
 # SUMMARY
 # ===============================
 print("\n📊 DAILY PRICE COLLECTION SUMMARY")
 print(f"✅ FILES SAVED : {saved}")
+if INCREMENTAL_MODE:
+    print(f"➕ APPENDED    : {appended}")
+    print(f"⏸ UP TO DATE  : {up_to_date}")
+    print(f"🔁 RE-PULLED   : {repulled}")
 print(f"⚠️ SKIPPED     : {skipped}")
 print(f"📁 TOTAL FILES : {len(os.listdir(DATA_DIR))}")
+
+data.save_report()
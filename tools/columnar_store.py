@@ -0,0 +1,283 @@
+import os
+import sys
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from indicators import FEATURE_COLUMNS
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+STORE_DIR = os.path.join(DATA_DIR, "store")
+
+CSV_DIRS = {
+    "prices": os.path.join(DATA_DIR, "prices"),
+    "features": os.path.join(DATA_DIR, "features")
+}
+
+# ===============================
+# CANONICAL SCHEMA
+# ===============================
+# One table per kind, partitioned by year:
+#   store/<kind>/year=YYYY/part-0.parquet   (all symbols, sorted by symbol, date)
+# Prices and indicators stay float64 (Yahoo bars are not float32-exact and
+# the signal thresholds must see the same numbers as before); volume is
+# int64, trend is dictionary encoded and parquet dictionary-encodes symbols.
+PRICE_FIELDS = [
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("adj_close", pa.float64()),
+    ("volume", pa.int64())
+]
+
+# Feature columns come from the indicator registry
+FEATURE_FIELDS = PRICE_FIELDS + [
+    (name, pa.dictionary(pa.int8(), pa.string()) if name == "trend" else pa.float64())
+    for name in FEATURE_COLUMNS
+]
+
+SCHEMAS = {
+    kind: pa.schema(
+        [("symbol", pa.string()), ("date", pa.timestamp("ms"))] + fields
+    )
+    for kind, fields in [("prices", PRICE_FIELDS), ("features", FEATURE_FIELDS)]
+}
+
+# Column order of the human-readable CSVs
+CSV_LAYOUT = {
+    "prices": ["date", "adj close", "close", "high", "low", "open", "volume"],
+    "features": [
+        "date", "adj close", "close", "high", "low", "open", "volume",
+        *FEATURE_COLUMNS
+    ]
+}
+
+
+def canonical_columns(df):
+    # "date_" -> "date", "adj close_360one.ns" -> "adj_close", "ema_20" stays
+    cols = {}
+    for c in df.columns:
+        base = c.split("_")[0]
+        if base in ("date", "open", "high", "low", "close", "adj close", "volume"):
+            cols[c] = base.replace(" ", "_")
+    return df.rename(columns=cols)
+
+
+def csv_layout(kind, df):
+    df = df.rename(columns={"adj_close": "adj close"})
+    return df[[c for c in CSV_LAYOUT[kind] if c in df.columns]]
+
+
+# ===============================
+# WRITE
+# ===============================
+def kind_dir(kind):
+    return os.path.join(STORE_DIR, kind)
+
+
+def partition_path(kind, year):
+    return os.path.join(kind_dir(kind), f"year={year}", "part-0.parquet")
+
+
+def partition_years(kind):
+    if not os.path.isdir(kind_dir(kind)):
+        return []
+    return sorted(
+        int(d.split("=")[1]) for d in os.listdir(kind_dir(kind)) if d.startswith("year=")
+    )
+
+
+def to_table(kind, df):
+    schema = SCHEMAS[kind]
+    df = df[[f.name for f in schema if f.name in df.columns]].copy()
+    df["date"] = pd.to_datetime(df["date"])
+
+    for f in schema:
+        if f.name not in df.columns:
+            df[f.name] = None
+        elif pa.types.is_integer(f.type):
+            df[f.name] = df[f.name].round().astype("Int64")
+
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def read_partition(kind, year):
+    path = partition_path(kind, year)
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path).to_pandas()
+
+
+def write_partition(kind, year, df):
+    path = partition_path(kind, year)
+
+    if df is None or df.empty:
+        if os.path.exists(path):
+            shutil.rmtree(os.path.dirname(path))
+        return
+
+    df = df.sort_values(["symbol", "date"]).reset_index(drop=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # "_" prefixed files are skipped by dataset discovery
+    tmp = os.path.join(os.path.dirname(path), "_part-0.parquet.tmp")
+    pq.write_table(to_table(kind, df), tmp)
+    os.replace(tmp, path)
+
+
+def write_frames(kind, frames):
+    # Replaces the full history of every symbol in `frames`
+    # ({symbol: DataFrame with canonical columns}); other symbols are kept.
+    if not frames:
+        return
+
+    new = pd.concat(
+        [df.assign(symbol=symbol) for symbol, df in frames.items()],
+        ignore_index=True
+    )
+    new["date"] = pd.to_datetime(new["date"])
+    new_years = new["date"].dt.year
+
+    for year in sorted(set(partition_years(kind)) | set(new_years)):
+        old = read_partition(kind, year)
+        if old is not None:
+            old = old[~old["symbol"].isin(frames.keys())]
+
+        part = pd.concat([old, new[new_years == year]], ignore_index=True)
+        write_partition(kind, year, part)
+
+
+def append_rows(kind, df):
+    # Upserts (symbol, date) rows; only the partitions of their years are
+    # rewritten
+    if df.empty:
+        return
+
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    years = df["date"].dt.year
+
+    for year in sorted(set(years)):
+        rows = df[years == year]
+        old = read_partition(kind, year)
+
+        if old is not None:
+            keys = pd.MultiIndex.from_frame(rows[["symbol", "date"]])
+            old = old[~pd.MultiIndex.from_frame(old[["symbol", "date"]]).isin(keys)]
+
+        write_partition(kind, year, pd.concat([old, rows], ignore_index=True))
+
+
+# ===============================
+# READ
+# ===============================
+def has_data(kind):
+    return bool(partition_years(kind))
+
+
+def load_panel(symbols=None, start=None, end=None, columns=None, kind="prices"):
+    # Long (symbol, date, ...) frame; only the requested columns are read and
+    # only the year partitions overlapping [start, end] are opened.
+    if not has_data(kind):
+        return pd.DataFrame(columns=["symbol", "date"] + list(columns or []))
+
+    dataset = ds.dataset(kind_dir(kind), format="parquet", partitioning="hive")
+
+    flt = None
+    conditions = []
+    if symbols is not None:
+        conditions.append(ds.field("symbol").isin(list(symbols)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions.append(ds.field("year") >= start.year)
+        conditions.append(ds.field("date") >= pa.scalar(start, pa.timestamp("ms")))
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions.append(ds.field("year") <= end.year)
+        conditions.append(ds.field("date") <= pa.scalar(end, pa.timestamp("ms")))
+    for c in conditions:
+        flt = c if flt is None else flt & c
+
+    names = ["symbol", "date"] + [c for c in (columns or SCHEMAS[kind].names[2:])]
+    df = dataset.to_table(columns=names, filter=flt).to_pandas()
+
+    if "trend" in df.columns:
+        df["trend"] = df["trend"].astype(object)
+
+    return df.sort_values(["symbol", "date"]).reset_index(drop=True)
+
+
+def symbol_frames(panel):
+    # Long panel -> {symbol: DataFrame}
+    return {
+        symbol: g.drop(columns="symbol").reset_index(drop=True)
+        for symbol, g in panel.groupby("symbol", sort=True)
+    }
+
+
+# ===============================
+# CSV INGEST / EXPORT
+# ===============================
+def ingest_csv(kind, csv_dir=None):
+    csv_dir = csv_dir or CSV_DIRS[kind]
+    frames = {}
+
+    for file in sorted(os.listdir(csv_dir)):
+        if not file.endswith(".csv"):
+            continue
+        try:
+            frames[file[:-len(".csv")]] = canonical_columns(pd.read_csv(os.path.join(csv_dir, file)))
+        except Exception as e:
+            print(f"❌ {file}: {e}")
+
+    write_frames(kind, frames)
+    return len(frames)
+
+
+def ensure_store(kind):
+    # One-time bootstrap from the CSV directories
+    if not has_data(kind) and os.path.isdir(CSV_DIRS[kind]):
+        n = ingest_csv(kind)
+        print(f"🗄️ {kind.upper()} STORE BUILT FROM {n} CSV FILES")
+
+
+def write_csv(task):
+    # task = (kind, path, df, append); one argument so it can be handed to
+    # parallel_map
+    kind, path, df, append = task
+    df = df.assign(date=pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d"))
+    csv_layout(kind, df).to_csv(path, mode="a" if append else "w", header=not append, index=False)
+    return len(df)
+
+
+def export_csv(kind, out_dir, symbols=None):
+    os.makedirs(out_dir, exist_ok=True)
+    frames = symbol_frames(load_panel(symbols=symbols, kind=kind))
+
+    for symbol, df in frames.items():
+        write_csv((kind, os.path.join(out_dir, f"{symbol}.csv"), df, False))
+
+    return len(frames)
+
+
+if __name__ == "__main__":
+    # python tools/columnar_store.py ingest <prices|features>
+    # python tools/columnar_store.py export <prices|features> <out_dir>
+    command = sys.argv[1] if len(sys.argv) > 1 else "ingest"
+    kinds = [sys.argv[2]] if len(sys.argv) > 2 else ["prices", "features"]
+
+    if command == "ingest":
+        for kind in kinds:
+            print(f"✅ {kind.upper()}: {ingest_csv(kind)} symbols -> {kind_dir(kind)}")
+    elif command == "export":
+        out_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join(DATA_DIR, "export", kinds[0])
+        print(f"✅ EXPORTED {export_csv(kinds[0], out_dir)} CSV FILES -> {out_dir}")
+    else:
+        raise ValueError(f"Unknown command: {command}")
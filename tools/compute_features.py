@@ -1,6 +1,20 @@
 import os
-import pandas as pd
+import sys
 import numpy as np
+import pandas as pd
+from datetime import date
+from columnar_store import (
+    append_rows, ensure_store, load_panel, partition_path, partition_years,
+    symbol_frames, write_csv, write_frames
+)
+from parallel import parallel_map, report_errors
+from panel import build_panel, panel_dir
+from snapshot import build_snapshot
+from manifest import Manifest, content_hash
+from indicators import (
+    compute_universe, update_universe, fresh_state, take_state, put_state,
+    concat_state, save_state, load_state, registry_token, FEATURE_COLUMNS
+)
 
 # ===============================
 # PATHS
@@ -9,101 +23,255 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market
 
 PRICE_DIR = os.path.join(BASE_DIR, "data", "prices")
 FEATURE_DIR = os.path.join(BASE_DIR, "data", "features")
+STATE_FILE = os.path.join(BASE_DIR, "state", "indicator_state.npz")
 
 os.makedirs(FEATURE_DIR, exist_ok=True)
+os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+
+# ===============================
+# CONFIG
+# ===============================
+# Daily runs advance the saved indicator state by the new bars only; every
+# FULL_CHECK_DAYS (or with --full) everything is recomputed from scratch and
+# compared with what the incremental runs produced. The stage is skipped when
+# neither the price store nor its outputs changed; --force recomputes all.
+FULL_CHECK_DAYS = 7
+DRIFT_TOL = 1e-9
+
+FORCE_FULL = "--full" in sys.argv or "--force" in sys.argv
+TODAY = date.today()
+
+ensure_store("prices")
+
+manifest = Manifest("compute_features", force=FORCE_FULL)
+
+PANEL_META = os.path.join(panel_dir("features"), "meta.json")
+
+
+def feature_csv(symbol):
+    return os.path.join(FEATURE_DIR, f"{symbol}.csv")
+
+
+def price_partitions():
+    return [partition_path("prices", year) for year in partition_years("prices")]
 
-files = [f for f in os.listdir(PRICE_DIR) if f.endswith(".csv")]
+# ===============================
+# LOAD INDICATOR STATE
+# ===============================
+saved = load_state(STATE_FILE)
+
+# A changed feature registry invalidates the saved state: start over
+REGISTRY = content_hash(registry_token().encode())
+if saved is not None and saved[3].get("registry") != REGISTRY:
+    saved = None
+
+if saved is None:
+    state_symbols, last_dates, state, meta = [], np.array([], dtype="datetime64[D]"), fresh_state(0), {}
+else:
+    state_symbols, last_dates, state, meta = saved
+
+state_index = {s: i for i, s in enumerate(state_symbols)}
+
+# ===============================
+# CHANGE DETECTION
+# ===============================
+stage_changed = manifest.changed("stage", inputs=price_partitions(), outputs=[STATE_FILE, PANEL_META], token=REGISTRY)
+edited = {s for s in state_symbols if manifest.changed(s, outputs=[feature_csv(s)])}
+
+if not stage_changed and not edited:
+    print("✅ NOTHING CHANGED SINCE THE LAST RUN — SKIPPING (use --force to recompute)")
+    exit()
+
+last_full = meta.get("last_full")
+full_run = (
+    FORCE_FULL
+    or not state_symbols
+    or last_full is None
+    or (TODAY - date.fromisoformat(last_full)).days >= FULL_CHECK_DAYS
+)
+
+# ===============================
+# LOAD PRICES
+# ===============================
+# Prices come from the columnar store: one read, canonical column names.
+# Incremental runs read only the partitions after the oldest saved bar.
+if full_run:
+    prices = symbol_frames(load_panel(kind="prices"))
+else:
+    prices = symbol_frames(load_panel(start=last_dates.min(), kind="prices"))
 
-print(f"🧠 COMPUTING FEATURES FOR {len(files)} STOCKS")
+print(f"🧠 COMPUTING FEATURES FOR {len(prices)} STOCKS ({'FULL' if full_run else 'INCREMENTAL'})")
 
 # ===============================
-# INDICATOR FUNCTIONS
+# SPLIT: INCREMENTAL vs FULL
 # ===============================
-def ema(series, period):
-    return series.ewm(span=period, adjust=False).mean()
+incremental = {}
+needs_full = []
+up_to_date = 0
 
-def rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
+for symbol, df in prices.items():
+    i = state_index.get(symbol)
 
-    avg_gain = gain.rolling(period).mean()
-    avg_loss = loss.rolling(period).mean()
+    # CSV missing or edited outside the pipeline: rebuild it in full
+    if full_run or i is None or symbol in edited:
+        needs_full.append(symbol)
+        continue
 
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+    # The saved close must still be the close of the saved bar; a restated
+    # history invalidates the running state
+    at_last = df[df["date"] == pd.Timestamp(last_dates[i])]
+    saved_close = state["close"][i]
 
-def atr(df, period=14):
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
+    if at_last.empty or not (
+        at_last["close"].iloc[-1] == saved_close
+        or (np.isnan(saved_close) and np.isnan(at_last["close"].iloc[-1]))
+    ):
+        needs_full.append(symbol)
+        continue
 
-    tr = pd.concat([
-        high - low,
-        (high - close.shift()).abs(),
-        (low - close.shift()).abs()
-    ], axis=1).max(axis=1)
+    new = df[df["date"] > pd.Timestamp(last_dates[i])].reset_index(drop=True)
+    if new.empty:
+        up_to_date += 1
+    else:
+        incremental[symbol] = new
 
-    return tr.rolling(period).mean()
+if not full_run and needs_full:
+    prices.update(symbol_frames(load_panel(symbols=needs_full, kind="prices")))
 
 # ===============================
-# MAIN LOOP
+# SELECT SYMBOLS
 # ===============================
 processed = 0
 skipped = 0
+ready = {}
 
-for file in files:
-    symbol = file.replace(".csv", "")
+for symbol in needs_full:
+    df = prices[symbol]
 
-    try:
-        df = pd.read_csv(os.path.join(PRICE_DIR, file))
+    required = {"open", "high", "low", "close", "volume"}
+    if not required.issubset(df.columns):
+        print(f"⚠️ {symbol}: missing OHLCV columns")
+        skipped += 1
+        continue
 
-        # --- Normalize column names ---
-        cols = {c: c.split("_")[0] for c in df.columns if c != "date"}
-        df = df.rename(columns=cols)
+    if len(df) < 200:
+        print(f"⚠️ {symbol}: insufficient history")
+        skipped += 1
+        continue
 
-        required = {"open", "high", "low", "close", "volume"}
-        if not required.issubset(df.columns):
-            print(f"⚠️ {symbol}: missing OHLCV columns")
-            skipped += 1
-            continue
+    ready[symbol] = df
 
-        if len(df) < 200:
-            print(f"⚠️ {symbol}: insufficient history")
-            skipped += 1
-            continue
+# ===============================
+# INDICATORS (WHOLE UNIVERSE AT ONCE)
+# ===============================
+# EMA 20/50/200, RSI 14, ATR 14 and the trend regime on one
+# (dates x symbols) array; identical to the per-symbol pandas results
+features, full_state = compute_universe(ready)
 
-        df["ema_20"] = ema(df["close"], 20)
-        df["ema_50"] = ema(df["close"], 50)
-        df["ema_200"] = ema(df["close"], 200)
+# O(1) per new bar from the saved state
+inc_idx = [state_index[s] for s in incremental]
+inc_state = take_state(state, inc_idx)
+appended = update_universe(incremental, inc_state)
 
-        df["rsi_14"] = rsi(df["close"], 14)
-        df["atr_14"] = atr(df, 14)
+# ===============================
+# DRIFT CHECK (FULL RUNS)
+# ===============================
+if full_run and state_symbols:
+    stored = load_panel(symbols=list(features), kind="features")
+    fresh = pd.concat(
+        [df.assign(symbol=s) for s, df in features.items()], ignore_index=True
+    ) if features else stored.iloc[:0]
 
-        # --- Trend Regime ---
-        df["trend"] = np.where(
-            (df["ema_20"] > df["ema_50"]) & (df["ema_50"] > df["ema_200"]),
-            "UP",
-            np.where(
-                (df["ema_20"] < df["ema_50"]) & (df["ema_50"] < df["ema_200"]),
-                "DOWN",
-                "SIDEWAYS"
-            )
-        )
+    both = stored.merge(fresh, on=["symbol", "date"], suffixes=("_old", "_new"))
 
-        out = os.path.join(FEATURE_DIR, f"{symbol}.csv")
-        df.to_csv(out, index=False)
+    drifted = set()
+    for col in [c for c in FEATURE_COLUMNS if c != "trend"]:
+        old = both[f"{col}_old"].to_numpy(dtype=float)
+        new = both[f"{col}_new"].to_numpy(dtype=float)
+        bad = ~np.isclose(old, new, rtol=DRIFT_TOL, atol=0, equal_nan=True)
+        drifted.update(both.loc[bad, "symbol"])
 
-        processed += 1
+    if drifted:
+        print(f"⚠️ DRIFT CHECK: {len(drifted)} symbols differed from the full recompute: {sorted(drifted)[:10]}")
+    else:
+        print(f"✅ DRIFT CHECK: incremental features match the full recompute ({len(both)} rows)")
 
-    except Exception as e:
-        print(f"❌ {symbol}: {e}")
-        skipped += 1
+# ===============================
+# HUMAN-READABLE CSV EXPORT (THREADS)
+# ===============================
+# Full rewrites for recomputed symbols, appended rows for the rest. The
+# writes are I/O-bound: threads, so no frame is pickled to a worker
+tasks = [
+    ("features", feature_csv(symbol), df, False)
+    for symbol, df in features.items()
+] + [
+    ("features", feature_csv(symbol), df, True)
+    for symbol, df in appended.items()
+]
+
+outcomes = parallel_map(write_csv, tasks, threads=True)
+failed = report_errors(outcomes, "Feature CSV export", name=lambda t: os.path.basename(t[1]))
+
+processed += len(outcomes) - len(failed)
+skipped += len(failed)
+
+write_frames("features", features)
+
+if appended:
+    append_rows("features", pd.concat(
+        [df.assign(symbol=s) for s, df in appended.items()], ignore_index=True
+    ))
+
+# ===============================
+# SAVE INDICATOR STATE
+# ===============================
+put_state(state, inc_idx, inc_state)
+for symbol, df in appended.items():
+    last_dates[state_index[symbol]] = np.datetime64(df["date"].iloc[-1], "D")
+
+# Fully recomputed symbols replace their old state (or are added)
+keep_idx = [i for s, i in state_index.items() if s not in features]
+
+state_symbols = [state_symbols[i] for i in keep_idx] + list(features)
+last_dates = np.concatenate([
+    last_dates[keep_idx],
+    np.array([df["date"].iloc[-1] for df in features.values()], dtype="datetime64[D]")
+])
+state = concat_state(take_state(state, keep_idx), full_state)
+
+if full_run:
+    meta["last_full"] = TODAY.isoformat()
+meta["registry"] = REGISTRY
+
+save_state(STATE_FILE, state_symbols, last_dates, state, meta)
+
+# Dense memmap panel for the downstream stages
+panel_shape = build_panel("features")
+
+# Last bars of every symbol for the "latest value" readers
+build_snapshot("features")
+
+# ===============================
+# UPDATE MANIFEST
+# ===============================
+for o in outcomes:
+    symbol = os.path.basename(o.item[1])[:-len(".csv")]
+    if o.error is None:
+        manifest.record(symbol, outputs=[feature_csv(symbol)])
+    else:
+        manifest.forget(symbol)
+
+manifest.record("stage", inputs=price_partitions(), outputs=[STATE_FILE, PANEL_META], token=REGISTRY)
+manifest.save()
 
 # ===============================
 # SUMMARY
 # ===============================
 print("\n📊 FEATURE ENGINEERING SUMMARY")
 print(f"✅ PROCESSED : {processed}")
+print(f"🔁 FULL      : {len(features)}")
+print(f"➕ APPENDED  : {len(appended)}")
+print(f"⏸️ UP TO DATE: {up_to_date}")
 print(f"⚠️ SKIPPED   : {skipped}")
 print(f"📁 TOTAL     : {len(os.listdir(FEATURE_DIR))}")
+print(f"🧮 PANEL     : {panel_shape[0]} symbols x {panel_shape[1]} dates x {panel_shape[2]} fields")
@@ -1,139 +1,122 @@
 import os
+import sys
 import pandas as pd
-import numpy as np
 from datetime import datetime
+from panel import open_panel
+from signal_store import SignalStore
+from signal_rules import score_signals, resolve_pending
+from manifest import Manifest
 
 # ===============================
 # PATHS
 # ===============================
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
 
-FEATURE_DIR = os.path.join(BASE_DIR, "data", "features")
 REPORT_DIR = os.path.join(BASE_DIR, "reports")
 
 os.makedirs(REPORT_DIR, exist_ok=True)
 
-SUMMARY_FILE = os.path.join(REPORT_DIR, "daily_learning.xlsx")
-SIGNAL_LOG_FILE = os.path.join(REPORT_DIR, "signal_log.xlsx")
+# Signals and summaries live in the signal store (state/signals.db);
+# set to True to also rewrite signal_log.xlsx / daily_learning.xlsx each run
+EXPORT_EXCEL = False
 
-files = [f for f in os.listdir(FEATURE_DIR) if f.endswith(".csv")]
+# Only symbols whose feature rows changed since the last run are evaluated
+# (a rerun or a holiday adds no duplicate signals); --force evaluates all
+FORCE = "--force" in sys.argv
 
-print(f"📊 RUNNING DAILY LEARNING ON {len(files)} STOCKS")
-
-today = datetime.now().date()
-
-signal_records = []
+# Whole universe from the memmap panel (no per-symbol CSV parsing)
+panel = open_panel("features")
+manifest = Manifest("daily_learning_metrics", force=FORCE)
+store = SignalStore()
 
 # ===============================
-# MAIN LOOP
+# RESOLVE MATURED SIGNALS
 # ===============================
-for file in files:
-    symbol = file.replace(".csv", "")
-
-    try:
-        df = pd.read_csv(os.path.join(FEATURE_DIR, file))
-
-        if len(df) < 220:
-            continue
-
-        df = df.dropna().reset_index(drop=True)
+# Forward returns of earlier signals whose 5-bar horizon has now elapsed
+resolved = resolve_pending(store, panel)
+store.commit()
 
-        last = df.iloc[-1]
-        future = df.iloc[-6]
+print(f"🎯 RESOLVED {resolved} MATURED SIGNALS ({store.pending_count()} pending)")
 
-        # ===============================
-        # SIGNAL FILTER
-        # ===============================
-        ema_stack_ok = last["ema_20"] > last["ema_50"] > last["ema_200"]
-        rsi_ok = 45 <= last["rsi_14"] <= 65
+tokens = {symbol: panel.fingerprint(symbol) for symbol in panel.symbols}
+changed = [s for s in panel.symbols if manifest.changed(s, token=tokens[s])]
 
-        atr_pct = last["atr_14"] / last["close"]
-        atr_ok = 0.01 <= atr_pct <= 0.06
+print(f"📊 RUNNING DAILY LEARNING ON {len(changed)} STOCKS ({len(panel.symbols) - len(changed)} unchanged)")
 
-        trend_1 = df.iloc[-1]["trend"] == "UP"
-        trend_2 = df.iloc[-2]["trend"] == "UP"
-        trend_3 = df.iloc[-3]["trend"] == "UP"
-
-        if not (ema_stack_ok and rsi_ok and atr_ok and trend_1 and trend_2):
-            continue
-
-        # ===============================
-        # SIGNAL SCORE
-        # ===============================
-        ema_score = np.clip(
-            ((last["ema_20"] - last["ema_200"]) / last["ema_200"]) * 300,
-            0, 30
-        )
-
-        rsi_score = np.clip(
-            25 - abs(last["rsi_14"] - 55) * 1.25,
-            0, 25
-        )
+if not changed:
+    store.close()
+    print("✅ No symbols changed since the last run (use --force to re-evaluate)")
+    exit()
 
-        atr_score = np.clip(
-            25 - abs(atr_pct - 0.03) * 500,
-            0, 25
-        )
+today = datetime.now().date()
 
-        trend_score = 20 if trend_1 and trend_2 and trend_3 else 12
+# ===============================
+# SCORE (ONE CROSS-SECTIONAL PASS)
+# ===============================
+# Filters and scores of all changed symbols as array expressions over their
+# latest panel rows (signal_rules.score_signals)
+signals = score_signals(panel, changed)
 
-        signal_score = round(
-            ema_score + rsi_score + atr_score + trend_score, 1
-        )
 
-        forward_return = (future["close"] - last["close"]) / last["close"]
+def record_evaluated():
+    # Marked done only once their signals are committed
+    for symbol in changed:
+        manifest.record(symbol, token=tokens[symbol])
+    manifest.save()
 
-        signal_records.append({
-            "date": today,
-            "symbol": symbol,
-            "signal_score": signal_score,
-            "forward_return_5d": forward_return,
-            "win": forward_return > 0,
-            "rsi": last["rsi_14"],
-            "atr": last["atr_14"],
-            "trend": last["trend"]
-        })
 
-    except Exception:
-        continue
+signal_records = [
+    {"date": today, **record}
+    for record in signals.to_dict("records")
+]
 
 # ===============================
-# SAVE SIGNAL LOG
+# SAVE SIGNAL LOG (APPEND ONLY)
 # ===============================
 if not signal_records:
+    record_evaluated()
+    store.close()
     print("⚠️ No valid signals today")
     exit()
 
-signal_df = pd.DataFrame(signal_records)
-
-if os.path.exists(SIGNAL_LOG_FILE):
-    old = pd.read_excel(SIGNAL_LOG_FILE)
-    signal_df = pd.concat([old, signal_df], ignore_index=True)
-
-signal_df.to_excel(SIGNAL_LOG_FILE, index=False)
+# Outcomes are unknown yet: logged unresolved and queued for resolution
+store.append_signals(signal_records)
+store.queue_pending(signal_records)
 
 # ===============================
 # DAILY SUMMARY
 # ===============================
+# Averages over the whole log, as before; computed inside the store
+# (outcome averages are None until the first signals resolve)
+totals = store.signal_totals()
+
+
+def average(name, digits):
+    return None if totals[name] is None else round(totals[name], digits)
+
+
 summary = {
     "date": today,
-    "stocks_evaluated": len(signal_df[signal_df["date"] == today]),
-    "avg_signal_score": round(signal_df["signal_score"].mean(), 1),
-    "win_rate": round(signal_df["win"].mean(), 3),
-    "avg_forward_return": round(signal_df["forward_return_5d"].mean(), 4),
-    "avg_atr": round(signal_df["atr"].mean(), 2),
+    # signals logged today, as before (not just this run's changed symbols)
+    "stocks_evaluated": store.signal_count(start=today, end=today),
+    "avg_signal_score": average("avg_signal_score", 1),
+    "win_rate": average("win_rate", 3),
+    "avg_forward_return": average("avg_forward_return", 4),
+    "avg_atr": average("avg_atr", 2),
     "status": "OK"
 }
 
-summary_df = pd.DataFrame([summary])
+store.append_summary(summary)
+store.commit()
+
+record_evaluated()
 
-if os.path.exists(SUMMARY_FILE):
-    old = pd.read_excel(SUMMARY_FILE)
-    final = pd.concat([old, summary_df], ignore_index=True)
-else:
-    final = summary_df
+if EXPORT_EXCEL:
+    store.export_excel(REPORT_DIR)
 
-final.to_excel(SUMMARY_FILE, index=False)
+store.close()
+
+summary_df = pd.DataFrame([summary])
 
 print("✅ DAILY LEARNING METRICS UPDATED")
 print(summary_df)
@@ -1,17 +1,25 @@
 import os
+import json
 import pandas as pd
-import yfinance as yf
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from price_sources import get_price_source
+from market_data import MarketData
 
 # -------------------------------
 # CONFIG
 # -------------------------------
 UNIVERSE_FILE = "market_ai/universe/all_equity.csv"
 OUTPUT_FILE = "market_ai/state/eligible_stocks_daily.csv"
+CACHE_FILE = "market_ai/state/market_cap_cache.csv"
+STATS_FILE = "market_ai/state/market_cap_stats.json"
 
 MIN_MARKET_CAP_CR = 1000          # ₹1000 Cr
 RUPEES_IN_CR = 1e7
 
+MAX_WORKERS = 16                  # throttled by the shared rate limiter
+CACHE_TTL_DAYS = 7                # market caps barely move day to day
+
 TODAY = date.today().isoformat()
 
 # -------------------------------
@@ -20,39 +28,92 @@ TODAY = date.today().isoformat()
 os.makedirs("market_ai/state", exist_ok=True)
 
 df = pd.read_csv(UNIVERSE_FILE)
+data = MarketData(get_price_source(), stage="filter_by_market_cap")
 
 print("TOTAL STOCKS IN UNIVERSE:", len(df))
 
-eligible = []
-
 # -------------------------------
-# MARKET CAP FILTER
+# MARKET CAP CACHE
 # -------------------------------
-for _, row in df.iterrows():
-    symbol = row["symbol"]
-    yahoo_symbol = row["yahoo_symbol"]
+cache = {}
+
+if os.path.exists(CACHE_FILE):
+    for _, row in pd.read_csv(CACHE_FILE).iterrows():
+        cache[row["yahoo_symbol"]] = (float(row["market_cap"]), row["fetched"])
+
 
+def is_fresh(yahoo_symbol):
+    if yahoo_symbol not in cache:
+        return False
+    fetched = date.fromisoformat(cache[yahoo_symbol][1])
+    return (date.today() - fetched).days < CACHE_TTL_DAYS
+
+
+# -------------------------------
+# CONCURRENT LOOKUP
+# -------------------------------
+def fetch_market_cap(yahoo_symbol):
+    # Returns (market_cap, error); timeouts, retries and throttling come
+    # from the shared fetch layer in market_data.py
     try:
-        ticker = yf.Ticker(yahoo_symbol)
-        info = ticker.fast_info
+        return data.market_cap(yahoo_symbol), None
+    except Exception as e:
+        return None, repr(e)
+
+
+symbols = list(zip(df["symbol"], df["yahoo_symbol"]))
+stale = [y for _, y in symbols if not is_fresh(y)]
 
-        market_cap = info.get("marketCap", None)
+print(f"CACHE HITS: {len(symbols) - len(stale)} | QUERYING: {len(stale)}")
 
-        if market_cap is None:
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+    fetched = dict(zip(stale, pool.map(fetch_market_cap, stale)))
+
+# -------------------------------
+# MARKET CAP FILTER
+# -------------------------------
+eligible = []
+failed = []
+missing = 0
+stale_fallback = 0
+
+for symbol, yahoo_symbol in symbols:
+    if yahoo_symbol in fetched:
+        market_cap, error = fetched[yahoo_symbol]
+
+        if error is not None:
+            failed.append({"symbol": symbol, "error": error})
+            data.fail(symbol, error)
+            if yahoo_symbol not in cache:
+                continue
+            # keep the last known value rather than shrinking the universe
+            market_cap = cache[yahoo_symbol][0]
+            stale_fallback += 1
+        elif market_cap is None:
+            missing += 1
             continue
+        else:
+            cache[yahoo_symbol] = (float(market_cap), TODAY)
+    else:
+        market_cap = cache[yahoo_symbol][0]
 
-        market_cap_cr = market_cap / RUPEES_IN_CR
+    market_cap_cr = market_cap / RUPEES_IN_CR
 
-        if market_cap_cr >= MIN_MARKET_CAP_CR:
-            eligible.append({
-                "symbol": symbol,
-                "yahoo_symbol": yahoo_symbol,
-                "market_cap_cr": round(market_cap_cr, 2),
-                "date": TODAY
-            })
+    if market_cap_cr >= MIN_MARKET_CAP_CR:
+        eligible.append({
+            "symbol": symbol,
+            "yahoo_symbol": yahoo_symbol,
+            "market_cap_cr": round(market_cap_cr, 2),
+            "date": TODAY
+        })
 
-    except Exception:
-        continue
+# -------------------------------
+# SAVE CACHE
+# -------------------------------
+pd.DataFrame(
+    [(y, cap, fetched_on) for y, (cap, fetched_on) in cache.items()],
+    columns=["yahoo_symbol", "market_cap", "fetched"]
+).to_csv(CACHE_FILE, index=False)
 
 # -------------------------------
 # SAVE OUTPUT
@@ -62,5 +123,26 @@ out_df = out_df.sort_values("market_cap_cr", ascending=False)
 
 out_df.to_csv(OUTPUT_FILE, index=False)
 
+# -------------------------------
+# SAVE STATS
+# -------------------------------
+stats = {
+    "date": TODAY,
+    "universe": len(symbols),
+    "cache_hits": len(symbols) - len(stale),
+    "cache_misses": len(stale),
+    "failures": len(failed),
+    "stale_fallback": stale_fallback,
+    "missing_market_cap": missing,
+    "eligible": len(out_df),
+    "failed_symbols": failed
+}
+
+with open(STATS_FILE, "w") as f:
+    json.dump(stats, f, indent=4)
+
 print("ELIGIBLE STOCKS (>=1000 Cr):", len(out_df))
+print(f"CACHE HITS: {stats['cache_hits']} | MISSES: {stats['cache_misses']} | FAILURES: {stats['failures']}")
 print("Saved to:", OUTPUT_FILE)
+
+data.save_report()
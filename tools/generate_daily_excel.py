@@ -1,11 +1,14 @@
 import os
+import heapq
+import math
 import pandas as pd
 from datetime import date
+from report_writer import ReportWriter
+from snapshot import open_snapshot
 
 # -------------------------------
 # CONFIG
 # -------------------------------
-DATA_DIR = "market_ai/data/prices"
 ELIGIBLE_FILE = "market_ai/state/eligible_stocks_daily.csv"
 LEARNING_FILE = "market_ai/outputs/learning_curve.xlsx"
 UNIVERSE_FILE = "market_ai/universe/all_equity.csv"
@@ -24,96 +27,101 @@ eligible_count = len(eligible_df)
 learning_df = pd.read_excel(LEARNING_FILE)
 learning_status = learning_df.iloc[-1]["status"]
 
+# -------------------------------
+# STREAMING REPORT (ONE PASS)
+# -------------------------------
+# Summary is the first sheet but is filled in last; stock rows go straight
+# to the workbook and only the running top-20 is kept in memory.
+output_file = f"{OUTPUT_DIR}/daily_report_{TODAY}.xlsx"
+
+FEATURE_COLUMNS = ["Symbol", "Close", "EMA20", "EMA50", "EMA200", "RSI14", "ATR14", "Trend"]
+TOP_TREND_SIZE = 20
+
+report = ReportWriter(output_file)
+report.sheet("Summary", ["Metric", "Value"])
+
+full_data = 0
+top_trend = []
+
 # -------------------------------
 # COLLECT FEATURES SAFELY
 # -------------------------------
-rows = []
+# Latest bar of every symbol from the feature snapshot (one small file)
+snapshot = open_snapshot("features")
 
 for _, row in eligible_df.iterrows():
     symbol = row["symbol"]
-    path = f"{DATA_DIR}/{symbol}.csv"
 
-    if not os.path.exists(path):
+    if symbol not in snapshot or snapshot.length(symbol) < 200:
         continue
 
-    df = pd.read_csv(path)
+    last = snapshot.latest(symbol)
 
     # need indicators
-    required_cols = {"ema20", "ema50", "ema200", "rsi14", "atr14"}
-    if len(df) < 200 or not required_cols.issubset(df.columns):
+    required_cols = ["close", "ema_20", "ema_50", "ema_200", "rsi_14", "atr_14"]
+    if any(math.isnan(last[c]) for c in required_cols):
         continue
 
-    last = df.iloc[-1]
-
-    trend = "UP" if last["close"] > last["ema200"] else "DOWN"
+    trend = "UP" if last["close"] > last["ema_200"] else "DOWN"
 
-    rows.append({
+    out = {
         "Symbol": symbol,
         "Close": round(last["close"], 2),
-        "EMA20": round(last["ema20"], 2),
-        "EMA50": round(last["ema50"], 2),
-        "EMA200": round(last["ema200"], 2),
-        "RSI14": round(last["rsi14"], 2),
-        "ATR14": round(last["atr14"], 2),
+        "EMA20": round(last["ema_20"], 2),
+        "EMA50": round(last["ema_50"], 2),
+        "EMA200": round(last["ema_200"], 2),
+        "RSI14": round(last["rsi_14"], 2),
+        "ATR14": round(last["atr_14"], 2),
         "Trend": trend
-    })
+    }
+
+    if full_data == 0:
+        report.sheet("Stock_Features", FEATURE_COLUMNS)
+    report.append("Stock_Features", out)
+    full_data += 1
+
+    # -------------------------------
+    # TOP TREND STOCKS (BOUNDED HEAP)
+    # -------------------------------
+    if out["Trend"] == "UP" and out["RSI14"] > 50:
+        item = (out["RSI14"], -full_data, out)
+        if len(top_trend) < TOP_TREND_SIZE:
+            heapq.heappush(top_trend, item)
+        else:
+            heapq.heappushpop(top_trend, item)
+
+# -------------------------------
+# SUMMARY SHEET
+# -------------------------------
+summary = [
+    ("Date", TODAY),
+    ("Universe Size", universe_size),
+    ("Eligible Stocks", eligible_count),
+    ("Stocks With Full Data", full_data),
+    ("Learning Status", learning_status)
+]
 
-features_df = pd.DataFrame(rows)
+for metric in summary:
+    report.append("Summary", metric)
 
 # -------------------------------
 # HANDLE EMPTY CASE (IMPORTANT)
 # -------------------------------
-if features_df.empty:
+if full_data == 0:
     print("⚠️ No stocks with full feature data today")
-
-    summary_df = pd.DataFrame({
-        "Metric": ["Date", "Universe Size", "Eligible Stocks", "Stocks With Full Data", "Learning Status"],
-        "Value": [TODAY, universe_size, eligible_count, 0, learning_status]
-    })
-
-    output_file = f"{OUTPUT_DIR}/daily_report_{TODAY}.xlsx"
-    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-        summary_df.to_excel(writer, sheet_name="Summary", index=False)
-
+    report.save()
     print("✅ DAILY EXCEL REPORT CREATED (EMPTY DATA SAFE)")
     exit()
 
-# -------------------------------
-# TOP TREND STOCKS (SAFE)
-# -------------------------------
-top_trend = features_df[
-    (features_df["Trend"] == "UP") &
-    (features_df["RSI14"] > 50)
-].sort_values("RSI14", ascending=False).head(20)
-
-# -------------------------------
-# SUMMARY SHEET
-# -------------------------------
-summary_df = pd.DataFrame({
-    "Metric": [
-        "Date",
-        "Universe Size",
-        "Eligible Stocks",
-        "Stocks With Full Data",
-        "Learning Status"
-    ],
-    "Value": [
-        TODAY,
-        universe_size,
-        eligible_count,
-        len(features_df),
-        learning_status
-    ]
-})
+report.write_rows(
+    "Top_Trend_Stocks",
+    FEATURE_COLUMNS,
+    (item[2] for item in sorted(top_trend, reverse=True))
+)
 
 # -------------------------------
 # WRITE EXCEL
 # -------------------------------
-output_file = f"{OUTPUT_DIR}/daily_report_{TODAY}.xlsx"
-
-with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-    summary_df.to_excel(writer, sheet_name="Summary", index=False)
-    features_df.to_excel(writer, sheet_name="Stock_Features", index=False)
-    top_trend.to_excel(writer, sheet_name="Top_Trend_Stocks", index=False)
+report.save()
 
 print("✅ DAILY EXCEL REPORT CREATED:", output_file)
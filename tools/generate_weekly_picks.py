@@ -1,41 +1,39 @@
 import os
 import pandas as pd
 from datetime import datetime
+from snapshot import open_snapshot
+from signal_store import SignalStore
+from report_writer import ReportWriter
 
 # ===============================
 # PATHS
 # ===============================
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
 
-FEATURE_DIR = os.path.join(BASE_DIR, "data", "features")
 REPORT_DIR = os.path.join(BASE_DIR, "reports")
 
-SIGNAL_LOG = os.path.join(REPORT_DIR, "signal_log.xlsx")
 OUT_FILE = os.path.join(REPORT_DIR, "weekly_picks.xlsx")
 
+# Per-stock history span: "all", "rolling" (signals dated within 90 days of
+# the newest resolved signal, not of today) or "decay" (30-day half-life,
+# from the same anchor)
+HISTORY_SPAN = "all"
+
 # ===============================
 # LOAD DATA
 # ===============================
-signals = pd.read_excel(SIGNAL_LOG)
-
-latest_date = signals["date"].max()
-
-recent = signals[signals["date"] == latest_date].copy()
+store = SignalStore()
+latest_date = store.latest_date()
+recent = store.signals(start=latest_date, end=latest_date) if latest_date is not None else store.signals()
 
 print(f"📅 Generating weekly picks for: {latest_date}")
 
 # ===============================
 # HISTORICAL PERFORMANCE PER STOCK
 # ===============================
-history = (
-    signals.groupby("symbol")
-    .agg(
-        win_rate=("win", "mean"),
-        avg_return=("forward_return_5d", "mean"),
-        signals=("signal_score", "count")
-    )
-    .reset_index()
-)
+# Running aggregates of the resolved signals, kept by the signal store
+history = store.aggregates("symbol", HISTORY_SPAN)[["symbol", "win_rate", "avg_return", "signals"]]
+store.close()
 
 # Merge with recent signals
 df = recent.merge(history, on="symbol", how="left")
@@ -43,23 +41,23 @@ df = recent.merge(history, on="symbol", how="left")
 # ===============================
 # TECHNICAL CONFIRMATION
 # ===============================
+# Last bars of every symbol from the feature snapshot (in memory)
+snapshot = open_snapshot("features")
+
 qualified = []
 
 for _, row in df.iterrows():
     symbol = row["symbol"]
-    feature_file = os.path.join(FEATURE_DIR, f"{symbol}.csv")
 
-    if not os.path.exists(feature_file):
+    if symbol not in snapshot:
         continue
 
-    fdf = pd.read_csv(feature_file)
-
-    if len(fdf) < 220:
+    if snapshot.length(symbol) < 220:
         continue
 
-    last = fdf.iloc[-1]
-    prev1 = fdf.iloc[-2]
-    prev2 = fdf.iloc[-3]
+    last = snapshot.latest(symbol)
+    prev1 = snapshot.latest(symbol, 1)
+    prev2 = snapshot.latest(symbol, 2)
 
     atr_pct = last["atr_14"] / last["close"]
 
@@ -109,7 +107,8 @@ weekly = weekly.head(15)
 # ===============================
 weekly["week"] = datetime.now().strftime("%Y-%U")
 
-weekly.to_excel(OUT_FILE, index=False)
+with ReportWriter(OUT_FILE) as report:
+    report.write_frame("Sheet1", weekly)
 
 print("✅ WEEKLY PICKS GENERATED")
 print(weekly[["symbol", "signal_score", "win_rate_%", "atr_%"]])
@@ -0,0 +1,501 @@
+import os
+import numpy as np
+
+# ===============================
+# UNIVERSE-WIDE INDICATOR ENGINE
+# ===============================
+# Indicators for every symbol at once on (dates x symbols) float64 arrays.
+#
+# Symbols list on different dates and have different histories, so each
+# symbol's own bars are compacted and right-aligned in its column: the last
+# row is every symbol's latest bar and rows before a symbol's first bar are
+# NaN. Leading NaNs never change the result of the recurrences below, so each
+# column computes exactly what the pandas per-symbol code computed:
+#
+#   ema          Series.ewm(span, adjust=False).mean()
+#   rolling_mean Series.rolling(window).mean() (same compensated running sum)
+#   rsi          rolling mean of clipped close deltas
+#   atr          rolling mean of max(high-low, |high-prev close|, |low-prev close|)
+#
+# The features are declared in a registry (see REGISTRY) and evaluated as a
+# dependency graph.
+#
+# The loops run over dates only; every step is a vector op across symbols.
+
+
+# -------------------------------
+# LAYOUT
+# -------------------------------
+def compact(frames, column):
+    # {symbol: DataFrame} -> (dates x symbols) array, right-aligned
+    symbols = list(frames)
+    depth = max((len(frames[s]) for s in symbols), default=0)
+    out = np.full((depth, len(symbols)), np.nan)
+
+    for j, s in enumerate(symbols):
+        values = frames[s][column].to_numpy(dtype=float)
+        if len(values):
+            out[depth - len(values):, j] = values
+
+    return out
+
+
+def uncompact(values, lengths):
+    # Inverse of compact for one column: per-symbol 1-D arrays
+    depth = values.shape[0]
+    return [values[depth - n:, j] for j, n in enumerate(lengths)]
+
+
+def shift(values, first=None):
+    # One bar back; row 0 takes `first` (the previous run's last bar) or NaN
+    out = np.empty_like(values)
+    out[0] = np.nan if first is None else first
+    out[1:] = values[:-1]
+    return out
+
+
+# -------------------------------
+# STATE
+# -------------------------------
+# Everything needed to advance the indicators by one bar, per symbol
+# (one column per symbol). A fresh state is indistinguishable from the
+# start of a series, so a full computation is just an advance from it.
+EMA_SPANS = (20, 50, 200)
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+
+
+def ema_state(n):
+    return {"weighted": np.full(n, np.nan), "old_wt": np.ones(n)}
+
+
+def rolling_state(window, n):
+    return {
+        "buffer": np.full((window, n), np.nan),
+        "nobs": np.zeros(n, dtype=np.int64),
+        "neg_ct": np.zeros(n, dtype=np.int64),
+        "same_ct": np.zeros(n, dtype=np.int64),
+        "sum_x": np.zeros(n),
+        "comp_add": np.zeros(n),
+        "comp_remove": np.zeros(n),
+        "prev_value": np.full(n, np.nan)
+    }
+
+
+def map_state(state, fn):
+    return {
+        k: map_state(v, fn) if isinstance(v, dict) else fn(v)
+        for k, v in state.items()
+    }
+
+
+def take_state(state, idx):
+    # Columns `idx` of every array (symbols are the last axis)
+    return map_state(state, lambda a: a[..., idx].copy())
+
+
+def put_state(state, idx, part):
+    for k, v in part.items():
+        if isinstance(v, dict):
+            put_state(state[k], idx, v)
+        else:
+            state[k][..., idx] = v
+
+
+def concat_state(*parts):
+    first = parts[0]
+    return {
+        k: concat_state(*[p[k] for p in parts]) if isinstance(v, dict)
+        else np.concatenate([p[k] for p in parts], axis=-1)
+        for k, v in first.items()
+    }
+
+
+# -------------------------------
+# RECURRENCES
+# -------------------------------
+def ema(values, span, state=None):
+    # pandas ewm(adjust=False, ignore_na=False): a missing bar decays the
+    # weight of the running average instead of resetting it
+    alpha = 2.0 / (span + 1.0)
+    old_wt_factor = 1.0 - alpha
+    new_wt = alpha
+
+    if state is None:
+        state = ema_state(values.shape[1])
+
+    weighted = state["weighted"]
+    old_wt = state["old_wt"]
+    out = np.empty_like(values)
+
+    for i in range(len(values)):
+        cur = values[i]
+        is_obs = ~np.isnan(cur)
+        started = ~np.isnan(weighted)
+
+        old_wt = np.where(started, old_wt * old_wt_factor, old_wt)
+
+        update = started & is_obs & (weighted != cur)
+        with np.errstate(invalid="ignore"):
+            mixed = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(update, mixed, weighted)
+        old_wt = np.where(started & is_obs, 1.0, old_wt)
+
+        weighted = np.where(~started & is_obs, cur, weighted)
+        out[i] = weighted
+
+    state["weighted"] = weighted
+    state["old_wt"] = old_wt
+    return out
+
+
+def rolling_mean(values, window, state=None):
+    # pandas rolling(window).mean(): Kahan-compensated running sum with
+    # separate add/remove compensation, sign clamping and the run-of-equal-
+    # values shortcut, so results match bit for bit
+    if state is None:
+        state = rolling_state(window, values.shape[1])
+
+    nobs = state["nobs"]
+    neg_ct = state["neg_ct"]
+    same_ct = state["same_ct"]
+    sum_x = state["sum_x"]
+    comp_add = state["comp_add"]
+    comp_remove = state["comp_remove"]
+    prev_value = state["prev_value"]
+
+    # the last `window` bars of the previous run leave the window first
+    ext = np.concatenate([state["buffer"], values])
+    out = np.empty_like(values)
+
+    for i in range(window, len(ext)):
+        val = ext[i - window]
+        ok = ~np.isnan(val)
+        y = -val - comp_remove
+        t = sum_x + y
+        comp_remove = np.where(ok, t - sum_x - y, comp_remove)
+        sum_x = np.where(ok, t, sum_x)
+        nobs = nobs - ok
+        neg_ct = neg_ct - (ok & np.signbit(val))
+
+        val = ext[i]
+        ok = ~np.isnan(val)
+        y = val - comp_add
+        t = sum_x + y
+        comp_add = np.where(ok, t - sum_x - y, comp_add)
+        sum_x = np.where(ok, t, sum_x)
+        nobs = nobs + ok
+        neg_ct = neg_ct + (ok & np.signbit(val))
+        same_ct = np.where(ok, np.where(val == prev_value, same_ct + 1, 1), same_ct)
+        prev_value = np.where(ok, val, prev_value)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = sum_x / nobs
+        result = np.where(same_ct >= nobs, prev_value, result)
+        result = np.where((same_ct < nobs) & (neg_ct == 0) & (result < 0), 0.0, result)
+        result = np.where((same_ct < nobs) & (neg_ct == nobs) & (result > 0), 0.0, result)
+
+        out[i - window] = np.where((nobs >= window) & (nobs > 0), result, np.nan)
+
+    state.update(
+        buffer=ext[len(ext) - window:].copy(),
+        nobs=nobs, neg_ct=neg_ct, same_ct=same_ct, sum_x=sum_x,
+        comp_add=comp_add, comp_remove=comp_remove, prev_value=prev_value
+    )
+    return out
+
+
+# -------------------------------
+# OPERATIONS
+# -------------------------------
+# Building blocks for the registry below. Stateful ones take the node's
+# state (None for a one-off computation from the start of the series).
+def lag(values, state=None):
+    out = shift(values, state)
+    if state is not None and len(values):
+        state[...] = values[-1]
+    return out
+
+
+def gain(delta):
+    missing = np.isnan(delta)
+    return np.where(missing | (delta >= 0), delta, 0.0)
+
+
+def loss(delta):
+    missing = np.isnan(delta)
+    return -np.where(missing | (delta <= 0), delta, 0.0)
+
+
+def rsi(avg_gain, avg_loss):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def true_range(high, low, prev_close):
+    return np.fmax(
+        np.fmax(high - low, np.abs(high - prev_close)),
+        np.abs(low - prev_close)
+    )
+
+
+def trend(ema_20, ema_50, ema_200):
+    return np.where(
+        (ema_20 > ema_50) & (ema_50 > ema_200),
+        "UP",
+        np.where(
+            (ema_20 < ema_50) & (ema_50 < ema_200),
+            "DOWN",
+            "SIDEWAYS"
+        )
+    )
+
+
+OPS = {
+    "lag": lag,
+    "sub": np.subtract,
+    "gain": gain,
+    "loss": loss,
+    "ema": ema,
+    "rolling_mean": rolling_mean,
+    "rsi": rsi,
+    "true_range": true_range,
+    "trend": trend
+}
+
+# Fresh per-symbol state of the stateful operations
+STATE_INIT = {
+    "lag": lambda n, params: np.full(n, np.nan),
+    "ema": lambda n, params: ema_state(n),
+    "rolling_mean": lambda n, params: rolling_state(params["window"], n)
+}
+
+
+# -------------------------------
+# REGISTRY
+# -------------------------------
+# Every feature and intermediate is a node: an operation, the nodes (or raw
+# inputs: close, high, low) it reads, its parameters and, for stateful
+# operations, the key of its running state. evaluate() resolves the graph
+# for the requested names and computes each node once, so intermediates
+# such as the previous close, close deltas and true range are shared by
+# everything that reads them.
+INPUTS = ("close", "high", "low")
+FEATURES = {}
+
+
+def register(name, op, inputs, state=None, **params):
+    node = {"op": op, "inputs": tuple(inputs), "params": params, "state": state}
+
+    if name in FEATURES and FEATURES[name] != node:
+        raise ValueError(f"Feature {name} is already registered differently")
+    if op not in OPS:
+        raise ValueError(f"Unknown operation {op}")
+    if (state is not None) != (op in STATE_INIT):
+        raise ValueError(f"Feature {name}: state key required only for stateful operations")
+
+    FEATURES[name] = node
+    return name
+
+
+register("prev_close", "lag", ["close"], state="close")
+register("close_delta", "sub", ["close", "prev_close"])
+register("gain", "gain", ["close_delta"])
+register("loss", "loss", ["close_delta"])
+register("avg_gain", "rolling_mean", ["gain"], state="gain", window=RSI_PERIOD)
+register("avg_loss", "rolling_mean", ["loss"], state="loss", window=RSI_PERIOD)
+register("tr", "true_range", ["high", "low", "prev_close"])
+
+for span in EMA_SPANS:
+    register(f"ema_{span}", "ema", ["close"], state=f"ema_{span}", span=span)
+
+register(f"rsi_{RSI_PERIOD}", "rsi", ["avg_gain", "avg_loss"])
+register(f"atr_{ATR_PERIOD}", "rolling_mean", ["tr"], state="tr", window=ATR_PERIOD)
+register("trend", "trend", ["ema_20", "ema_50", "ema_200"])
+
+
+def atr_feature(period):
+    # Name of the ATR node for `period`, registered on first use
+    name = f"atr_{period}"
+    if name not in FEATURES:
+        register(name, "rolling_mean", ["tr"], state=f"tr_{period}", window=period)
+    return name
+
+
+# Columns written to the feature tables, in this order
+FEATURE_COLUMNS = (
+    *[f"ema_{span}" for span in EMA_SPANS],
+    f"rsi_{RSI_PERIOD}",
+    f"atr_{ATR_PERIOD}",
+    "trend"
+)
+
+
+def plan(names):
+    # Nodes needed for `names`, dependencies first
+    order = []
+    seen = set()
+
+    def visit(name, path):
+        if name in seen or name in INPUTS:
+            return
+        if name not in FEATURES:
+            raise KeyError(f"Unknown feature {name}")
+        if name in path:
+            raise ValueError(f"Feature cycle through {name}")
+        for dep in FEATURES[name]["inputs"]:
+            visit(dep, path | {name})
+        seen.add(name)
+        order.append(name)
+
+    for name in names:
+        visit(name, frozenset())
+    return order
+
+
+def evaluate(inputs, names, state=None):
+    # inputs: {"close": array, ...} (dates x symbols); returns {name: array}
+    # for `names`. With `state` every stateful node on the path is advanced
+    # in place; without it the series are computed from their start.
+    values = dict(inputs)
+
+    for name in plan(names):
+        node = FEATURES[name]
+        args = [values[dep] for dep in node["inputs"]]
+        if node["state"] is not None:
+            node_state = None if state is None else state[node["state"]]
+            values[name] = OPS[node["op"]](*args, state=node_state, **node["params"])
+        else:
+            values[name] = OPS[node["op"]](*args, **node["params"])
+
+    return {name: values[name] for name in names}
+
+
+def fresh_state(n, names=FEATURE_COLUMNS):
+    # Start-of-series state for every stateful node behind `names`
+    state = {}
+    for name in plan(names):
+        node = FEATURES[name]
+        if node["state"] is not None:
+            state[node["state"]] = STATE_INIT[node["op"]](n, node["params"])
+    return state
+
+
+def registry_token():
+    # Changes whenever a feature definition does (invalidates saved state)
+    return repr(sorted((name, repr(node)) for name, node in FEATURES.items()))
+
+
+def advance(close, high, low, state):
+    # Feature columns for the given bars (dates x symbols); `state` moves
+    # to the last bar
+    return evaluate({"close": close, "high": high, "low": low}, FEATURE_COLUMNS, state)
+
+
+# -------------------------------
+# FEATURE TABLES
+# -------------------------------
+def assign_columns(frames, columns):
+    lengths = [len(df) for df in frames.values()]
+    split = {name: uncompact(values, lengths) for name, values in columns.items()}
+
+    return {
+        symbol: df.assign(**{name: split[name][j] for name in columns})
+        for j, (symbol, df) in enumerate(frames.items())
+    }
+
+
+def compute_universe(frames):
+    # {symbol: OHLCV DataFrame} -> ({symbol: DataFrame with feature columns},
+    # state after each symbol's last bar, columns in `frames` order)
+    state = fresh_state(len(frames))
+    if not frames:
+        return {}, state
+
+    columns = advance(
+        compact(frames, "close"),
+        compact(frames, "high"),
+        compact(frames, "low"),
+        state
+    )
+
+    return assign_columns(frames, columns), state
+
+
+def update_universe(frames, state):
+    # Appends bars to running indicators: `frames` holds only the new bars of
+    # each symbol, `state` (columns in `frames` order) is advanced in place.
+    # Symbols are grouped by their number of new bars so every block is dense
+    # (no padding rows feeding the recurrences).
+    symbols = list(frames)
+    out = {}
+
+    by_length = {}
+    for j, symbol in enumerate(symbols):
+        by_length.setdefault(len(frames[symbol]), []).append(j)
+
+    for length, idx in by_length.items():
+        if length == 0:
+            continue
+
+        group = {symbols[j]: frames[symbols[j]] for j in idx}
+        part = take_state(state, idx)
+
+        columns = advance(
+            compact(group, "close"),
+            compact(group, "high"),
+            compact(group, "low"),
+            part
+        )
+
+        put_state(state, idx, part)
+        out.update(assign_columns(group, columns))
+
+    return out
+
+
+# -------------------------------
+# PERSISTENCE
+# -------------------------------
+def save_state(path, symbols, last_dates, state, meta=None):
+    flat = {}
+
+    def walk(prefix, node):
+        for k, v in node.items():
+            if isinstance(v, dict):
+                walk(f"{prefix}{k}.", v)
+            else:
+                flat[f"state.{prefix}{k}"] = v
+
+    walk("", state)
+
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        symbols=np.array(symbols, dtype=str),
+        last_dates=np.array(last_dates, dtype="datetime64[D]"),
+        meta=np.array([f"{k}={v}" for k, v in (meta or {}).items()], dtype=str),
+        **flat
+    )
+    os.replace(tmp, path)
+
+
+def load_state(path):
+    # -> (symbols, last_dates, state, meta); None if there is no state yet
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as data:
+        state = {}
+        for key in data.files:
+            if not key.startswith("state."):
+                continue
+            node = state
+            parts = key[len("state."):].split(".")
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            node[parts[-1]] = data[key]
+
+        meta = dict(item.split("=", 1) for item in data["meta"])
+        return list(data["symbols"]), data["last_dates"], state, meta
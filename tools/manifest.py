@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+MANIFEST_DIR = os.path.join(BASE_DIR, "state", "manifests")
+
+# ===============================
+# CHANGE-DETECTION MANIFEST
+# ===============================
+# One JSON file per stage: for every key (a symbol, or "stage" for the stage
+# as a whole) the fingerprints of the inputs it was built from and of the
+# outputs it wrote. A key is reprocessed only if something differs: an input
+# or output changed (mtime + size) or disappeared, or the caller's content
+# token (e.g. a hash of the symbol's panel rows) is different. force=True
+# (the stages' --force flag) treats everything as changed.
+#
+# Record a key only after its outputs are safely written, so a crash leaves
+# it marked as changed and the rerun picks it up.
+
+
+def fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class Manifest:
+
+    def __init__(self, stage, force=False):
+        self.stage = stage
+        self.force = force
+        self.path = os.path.join(MANIFEST_DIR, f"{stage}.json")
+
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+
+    def changed(self, key, inputs=(), outputs=(), token=None):
+        entry = self.entries.get(key)
+
+        if self.force or entry is None:
+            return True
+        if token is not None and entry.get("token") != token:
+            return True
+
+        recorded = entry.get("inputs", {})
+        if set(recorded) != {str(p) for p in inputs}:
+            return True
+        if any(fingerprint(p) != recorded[str(p)] for p in inputs):
+            return True
+
+        recorded = entry.get("outputs", {})
+        if any(fingerprint(p) != recorded.get(str(p)) for p in outputs):
+            return True
+
+        return False
+
+    def record(self, key, inputs=(), outputs=(), token=None):
+        entry = {
+            "inputs": {str(p): fingerprint(p) for p in inputs},
+            "outputs": {str(p): fingerprint(p) for p in outputs}
+        }
+        if token is not None:
+            entry["token"] = token
+        self.entries[key] = entry
+
+    def forget(self, key):
+        self.entries.pop(key, None)
+
+    def save(self):
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import random
+import threading
+from datetime import date
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+STATE_DIR = os.path.join(BASE_DIR, "state")
+
+# ===============================
+# CONFIG
+# ===============================
+# Shared by every tool that talks to the market-data provider. RATE_LIMIT is
+# requests per second across all threads of a run; a batched download of N
+# tickers costs N tokens because yfinance issues one request per ticker.
+RATE_LIMIT = float(os.environ.get("MARKET_AI_RATE_LIMIT", "4"))
+BURST = int(os.environ.get("MARKET_AI_BURST", "50"))
+MAX_RETRIES = int(os.environ.get("MARKET_AI_MAX_RETRIES", "4"))
+BACKOFF_BASE = 1.0                # seconds
+BACKOFF_MAX = 30.0
+REQUEST_TIMEOUT = 10              # seconds per HTTP request
+POOL_SIZE = 32                    # pooled connections per host
+
+# ===============================
+# HTTP SESSION (CONNECTION POOLING)
+# ===============================
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One pooled session per process. Recent yfinance releases require a
+    # curl_cffi session; older ones take a plain requests.Session.
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            return _session
+
+        try:
+            from curl_cffi import requests as curl_requests
+            _session = curl_requests.Session(impersonate="chrome", timeout=REQUEST_TIMEOUT)
+        except ImportError:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            class TimeoutAdapter(HTTPAdapter):
+                def send(self, request, **kwargs):
+                    if kwargs.get("timeout") is None:
+                        kwargs["timeout"] = REQUEST_TIMEOUT
+                    return super().send(request, **kwargs)
+
+            _session = requests.Session()
+            adapter = TimeoutAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+
+        return _session
+
+
+# ===============================
+# TOKEN BUCKET RATE LIMITER
+# ===============================
+class RateLimiter:
+
+    def __init__(self, rate=RATE_LIMIT, burst=BURST):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        cost = min(cost, self.capacity)
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+
+                wait = (cost - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+limiter = RateLimiter()
+
+
+def backoff_delay(attempt):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+# ===============================
+# FETCH LAYER
+# ===============================
+class EmptyDownload(Exception):
+    pass
+
+
+class MarketData:
+    # Wraps a price source (see price_sources.py) with rate limiting,
+    # retry/backoff and a per-run failure report.
+
+    def __init__(self, source, stage):
+        self.source = source
+        self.stage = stage
+        self.remote = getattr(source, "remote", False)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = {}
+
+    def call(self, fn, *args, cost=1, **kwargs):
+        error = None
+
+        for attempt in range(MAX_RETRIES):
+            if self.remote:
+                limiter.acquire(cost)
+
+            with self.lock:
+                self.requests += 1
+
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+
+            if attempt < MAX_RETRIES - 1:
+                with self.lock:
+                    self.retries += 1
+                if self.remote:
+                    time.sleep(backoff_delay(attempt))
+
+        raise error
+
+    def download(self, tickers, **kwargs):
+        cost = 1 if isinstance(tickers, str) else len(tickers)
+        return self.call(self.download_frame, tickers, cost=cost, **kwargs)
+
+    def download_frame(self, tickers, **kwargs):
+        # yfinance reports a failed download as an empty frame instead of
+        # raising; make it an error so it is retried and, once the retries
+        # are exhausted, reaches the caller (and its fail() report)
+        df = self.source.download(tickers, **kwargs)
+        if df is None or df.empty:
+            raise EmptyDownload(f"no data returned for {tickers}")
+        return df
+
+    def market_cap(self, yahoo_symbol):
+        return self.call(self.source.market_cap, yahoo_symbol)
+
+    def fail(self, symbol, error):
+        with self.lock:
+            self.failures[str(symbol)] = error if isinstance(error, str) else repr(error)
+
+    def save_report(self):
+        report = {
+            "date": date.today().isoformat(),
+            "stage": self.stage,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failed": len(self.failures),
+            "failures": self.failures
+        }
+
+        os.makedirs(STATE_DIR, exist_ok=True)
+        path = os.path.join(STATE_DIR, f"fetch_report_{self.stage}.json")
+
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+
+        if self.failures:
+            print(f"⚠️ {len(self.failures)} FETCH FAILURES — see {path}")
+
+        return path
@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from columnar_store import ensure_store, load_panel, partition_path, partition_years
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+PANEL_DIR = os.path.join(BASE_DIR, "data", "panel")
+
+# ===============================
+# DENSE UNIVERSE PANEL (MEMMAP)
+# ===============================
+# panel/<kind>/values-<build>.bin : symbols x dates x fields, C order
+# panel/<kind>/meta.json          : symbols, dates, fields, dtype, values file
+#
+# Stages open the array with np.memmap (zero-copy, shared through the page
+# cache across processes). float64 rather than float32: Yahoo bars are not
+# float32-exact and the signal thresholds must see the same numbers as the
+# CSV path. Each build writes a new values file and then swaps meta.json, so
+# readers that still map the old file (e.g. the dashboard) are not disturbed.
+PANEL_DTYPE = "float64"
+
+# trend is stored as a number
+TREND_CODES = {"DOWN": -1.0, "SIDEWAYS": 0.0, "UP": 1.0}
+TREND_LABELS = {v: k for k, v in TREND_CODES.items()}
+
+
+def panel_dir(kind):
+    return os.path.join(PANEL_DIR, kind)
+
+
+def build_panel(kind="features"):
+    ensure_store(kind)
+    long = load_panel(kind=kind)
+
+    # one row per (symbol, date); keep the last bar if a date repeats
+    long = long.drop_duplicates(["symbol", "date"], keep="last")
+
+    fields = [c for c in long.columns if c not in ("symbol", "date")]
+    if "trend" in fields:
+        long["trend"] = long["trend"].map(TREND_CODES)
+
+    symbols = sorted(long["symbol"].unique())
+    dates = pd.DatetimeIndex(sorted(long["date"].unique()))
+
+    sym_idx = pd.Index(symbols).get_indexer(long["symbol"])
+    date_idx = dates.get_indexer(long["date"])
+
+    out_dir = panel_dir(kind)
+    os.makedirs(out_dir, exist_ok=True)
+
+    values_file = f"values-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}.bin"
+    shape = (len(symbols), len(dates), len(fields))
+
+    if long.empty:
+        # nothing to map (np.memmap rejects empty files)
+        values_file = None
+    else:
+        values = np.memmap(os.path.join(out_dir, values_file), dtype=PANEL_DTYPE, mode="w+", shape=shape)
+        values[:] = np.nan
+        values[sym_idx, date_idx, :] = long[fields].to_numpy(dtype=PANEL_DTYPE, na_value=np.nan)
+        values.flush()
+        del values
+
+    meta = {
+        "kind": kind,
+        "values_file": values_file,
+        "dtype": PANEL_DTYPE,
+        "shape": list(shape),
+        "symbols": symbols,
+        "dates": [d.strftime("%Y-%m-%d") for d in dates],
+        "fields": fields
+    }
+
+    tmp = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(out_dir, "meta.json"))
+
+    # drop superseded builds; files still mapped elsewhere (Windows) are
+    # picked up by the next build
+    for file in os.listdir(out_dir):
+        if file.startswith("values-") and file != values_file:
+            try:
+                os.remove(os.path.join(out_dir, file))
+            except OSError:
+                pass
+
+    return shape
+
+
+class Panel:
+
+    def __init__(self, kind="features"):
+        with open(os.path.join(panel_dir(kind), "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        self.kind = kind
+        self.symbols = meta["symbols"]
+        self.dates = pd.DatetimeIndex(pd.to_datetime(meta["dates"]))
+        self.fields = meta["fields"]
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+
+        if meta["values_file"] is None:
+            self.values = np.empty(tuple(meta["shape"]), dtype=meta["dtype"])
+        else:
+            self.values = np.memmap(
+                os.path.join(panel_dir(kind), meta["values_file"]),
+                dtype=meta["dtype"],
+                mode="r",
+                shape=tuple(meta["shape"])
+            )
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def field(self, name):
+        # symbols x dates view, no copy
+        return self.values[:, :, self.fields.index(name)]
+
+    def fingerprint(self, symbol):
+        # Content hash of the symbol's own bars (independent of dates other
+        # symbols added to the panel)
+        block = np.asarray(self.values[self.index[symbol]])
+        rows = ~np.isnan(block).all(axis=1)
+
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.ascontiguousarray(block[rows]).tobytes())
+        h.update(self.dates[rows].asi8.tobytes())
+        return h.hexdigest()
+
+    def frame(self, symbol):
+        # The symbol's own bars (dates where it has any value) as a DataFrame
+        block = np.asarray(self.values[self.index[symbol]])
+        rows = ~np.isnan(block).all(axis=1)
+
+        df = pd.DataFrame(block[rows], columns=self.fields)
+        df.insert(0, "date", self.dates[rows])
+
+        if "trend" in df.columns:
+            df["trend"] = df["trend"].map(TREND_LABELS)
+
+        return df
+
+
+def store_mtime(kind):
+    return max(
+        (os.path.getmtime(partition_path(kind, year)) for year in partition_years(kind)),
+        default=0
+    )
+
+
+def open_panel(kind="features"):
+    # (Re)builds the panel when it is missing or older than the columnar store
+    meta = os.path.join(panel_dir(kind), "meta.json")
+    if not os.path.exists(meta) or os.path.getmtime(meta) < store_mtime(kind):
+        build_panel(kind)
+    return Panel(kind)
+
+
+if __name__ == "__main__":
+    # python tools/panel.py [prices|features]
+    kinds = sys.argv[1:] or ["prices", "features"]
+
+    for kind in kinds:
+        shape = build_panel(kind)
+        print(f"✅ {kind.upper()} PANEL: {shape[0]} symbols x {shape[1]} dates x {shape[2]} fields")
@@ -0,0 +1,75 @@
+import os
+import math
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# ===============================
+# CONFIG
+# ===============================
+# MARKET_AI_WORKERS=1 runs everything in-process (handy for debugging)
+WORKERS = int(os.environ.get("MARKET_AI_WORKERS", "0")) or (os.cpu_count() or 1)
+CHUNKS_PER_WORKER = 4
+
+# ===============================
+# PARALLEL MAP
+# ===============================
+# parallel_map(fn, items) -> [Outcome(item, value, error), ...] in the order
+# of `items`, whatever order the workers finish in. An exception raised for
+# one item is captured as that item's error (a one-line summary, the full
+# traceback is in .trace) instead of aborting the stage or vanishing.
+#
+# Items are sent to workers in chunks so small tasks are not dominated by
+# inter-process overhead. `fn` must be importable (defined in a tools module,
+# not in the calling script) because worker processes import it by name, and
+# a script that uses processes keeps its body under
+# `if __name__ == "__main__":` so spawned workers (Windows, macOS) that
+# re-import it do not re-run the stage.
+# threads=True uses a thread pool instead, for I/O-bound loops that must
+# share in-process state (e.g. the download rate limiter).
+
+Outcome = namedtuple("Outcome", ["item", "value", "error", "trace"])
+
+
+def run_chunk(fn, chunk):
+    out = []
+    for item in chunk:
+        try:
+            out.append(Outcome(item, fn(item), None, None))
+        except Exception as e:
+            out.append(Outcome(item, None, f"{type(e).__name__}: {e}", traceback.format_exc()))
+    return out
+
+
+def parallel_map(fn, items, workers=None, chunksize=None, threads=False):
+    items = list(items)
+    workers = max(1, min(workers or WORKERS, len(items) or 1))
+
+    if workers == 1:
+        return run_chunk(fn, items)
+
+    chunksize = chunksize or max(1, math.ceil(len(items) / (workers * CHUNKS_PER_WORKER)))
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+
+    if threads:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_chunk, [fn] * len(chunks), chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_chunk, [fn] * len(chunks), chunks))
+
+    return [outcome for chunk in results for outcome in chunk]
+
+
+def report_errors(outcomes, label, name=str, show=5):
+    # Prints a short summary of the failed items; returns them
+    failed = [o for o in outcomes if o.error is not None]
+
+    if failed:
+        print(f"⚠️ {label}: {len(failed)} failed")
+        for o in failed[:show]:
+            print(f"   ❌ {name(o.item)}: {o.error}")
+        if len(failed) > show:
+            print(f"   ... and {len(failed) - show} more")
+
+    return failed
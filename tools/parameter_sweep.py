@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import random
+import itertools
+import pandas as pd
+from panel import open_panel, panel_dir
+from manifest import content_hash
+from parallel import parallel_map, report_errors
+from portfolio_backtest import DEFAULTS, backtest_point, parse_params
+from report_writer import ReportWriter
+
+# ===============================
+# PATHS
+# ===============================
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(TOOLS_DIR, "..", "market_ai"))
+REPORT_DIR = os.path.join(BASE_DIR, "reports")
+STATE_DIR = os.path.join(BASE_DIR, "state")
+
+OUT_FILE = os.path.join(REPORT_DIR, "parameter_sweep.xlsx")
+CACHE_FILE = os.path.join(STATE_DIR, "parameter_sweep.json")
+
+# ===============================
+# PARAMETER SWEEP
+# ===============================
+# Runs the portfolio backtest over a grid (or a random sample of it) of the
+# selection thresholds, in worker processes that all map the same read-only
+# feature panel. Every evaluated point is cached by its parameters, for the
+# panel and the backtest code it was run with: a rerun only computes the
+# points it has not seen, and a new panel build or an edit of CODE_FILES
+# (backtest, signal rules and HORIZON, panel codes) starts the cache over.
+#
+#   python tools/parameter_sweep.py [--random=N] [--seed=S] [--force]
+#                                   [--hold_bars=10 ...]
+#
+# --random=N evaluates N points drawn from the grid instead of all of it;
+# other --name=value arguments fix a backtest parameter for every point.
+GRID = {
+    "rsi_min": [40, 45, 50],
+    "rsi_max": [60, 65, 70],
+    "atr_pct_min": [0.01, 0.02],
+    "atr_pct_max": [0.05, 0.06, 0.08],
+    "min_score": [65.0, 70.0, 75.0],
+    "min_win_rate": [0.5, 0.55, 0.6],
+    "top_n": [10, 15, 20]
+}
+
+RANK_BY = "sharpe"
+
+CODE_FILES = ["portfolio_backtest.py", "signal_rules.py", "panel.py"]
+
+SWEEP_ARGS = ("--random=", "--seed=", "--force")
+RANDOM_POINTS = next((int(a.split("=", 1)[1]) for a in sys.argv if a.startswith("--random=")), None)
+SEED = next((int(a.split("=", 1)[1]) for a in sys.argv if a.startswith("--seed=")), 0)
+FORCE = "--force" in sys.argv
+
+
+def grid_points(grid, fixed):
+    names = list(grid)
+    points = []
+    for combo in itertools.product(*(grid[n] for n in names)):
+        p = {**DEFAULTS, **fixed, **dict(zip(names, combo))}
+        if p["rsi_min"] < p["rsi_max"] and p["atr_pct_min"] < p["atr_pct_max"]:
+            points.append(p)
+    return points
+
+
+def point_key(params):
+    return content_hash(json.dumps(params, sort_keys=True).encode())
+
+
+def cache_token(kind="features"):
+    # hash of the panel's meta.json and of the code that turns it into results
+    parts = [os.path.join(panel_dir(kind), "meta.json")] + [os.path.join(TOOLS_DIR, f) for f in CODE_FILES]
+    data = b""
+    for path in parts:
+        with open(path, "rb") as f:
+            data += content_hash(f.read()).encode()
+    return content_hash(data)
+
+
+def load_cache(token):
+    if FORCE or not os.path.exists(CACHE_FILE):
+        return {}
+    with open(CACHE_FILE, "r") as f:
+        cache = json.load(f)
+    return cache["points"] if cache.get("token") == token else {}
+
+
+def save_cache(token, points):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp = CACHE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"token": token, "points": points}, f, default=str)
+    os.replace(tmp, CACHE_FILE)
+
+
+if __name__ == "__main__":
+    fixed = parse_params([a for a in sys.argv[1:] if not a.startswith(SWEEP_ARGS)])
+
+    points = grid_points(GRID, fixed)
+    if RANDOM_POINTS is not None and RANDOM_POINTS < len(points):
+        points = random.Random(SEED).sample(points, RANDOM_POINTS)
+
+    # the panel is (re)built here once; workers only map it
+    panel = open_panel("features")
+    token = cache_token()
+
+    cache = load_cache(token)
+    todo = [p for p in points if point_key(p) not in cache]
+
+    print(f"🧪 PARAMETER SWEEP: {len(points)} points ({len(points) - len(todo)} cached, {len(todo)} to run)")
+
+    if todo:
+        # one prepared signal set per worker, wide enough for every point
+        rules = {
+            "rsi_min": min(p["rsi_min"] for p in todo),
+            "rsi_max": max(p["rsi_max"] for p in todo),
+            "atr_pct_min": min(p["atr_pct_min"] for p in todo),
+            "atr_pct_max": max(p["atr_pct_max"] for p in todo)
+        }
+        outcomes = parallel_map(backtest_point, [(p, rules) for p in todo])
+        report_errors(outcomes, "SWEEP POINTS", name=lambda item: json.dumps(item[0]))
+
+        for o in outcomes:
+            if o.error is None:
+                cache[point_key(o.item[0])] = o.value
+        save_cache(token, cache)
+
+    # ===============================
+    # RESULTS TABLE
+    # ===============================
+    rows = [cache[point_key(p)] for p in points if point_key(p) in cache]
+    if not rows:
+        print("⚠️ No results")
+        exit()
+
+    results = pd.DataFrame(rows).sort_values(RANK_BY, ascending=False).reset_index(drop=True)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with ReportWriter(OUT_FILE) as report:
+        report.write_frame("Results", results)
+
+    shown = list(GRID) + ["total_return", "max_drawdown", "sharpe", "trades"]
+    print("✅ SWEEP COMPLETE")
+    print(f"🏆 TOP 5 BY {RANK_BY.upper()}:")
+    print(results[shown].head(5).to_string(index=False))
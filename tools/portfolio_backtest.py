@@ -0,0 +1,399 @@
+import os
+import sys
+import math
+import numpy as np
+import pandas as pd
+from panel import TREND_CODES, Panel, open_panel
+from signal_rules import HORIZON, RULES, forward_bars, history_signals
+from report_writer import ReportWriter
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+REPORT_DIR = os.path.join(BASE_DIR, "reports")
+
+OUT_FILE = os.path.join(REPORT_DIR, "portfolio_backtest.xlsx")
+
+# ===============================
+# PORTFOLIO BACKTEST (VECTORIZED)
+# ===============================
+# Replays the weekly picks over the whole feature history:
+#
+#   1. every bar is scored with the daily signal rules (history_signals) and
+#      each signal's 5-bar outcome is known from the bar it matured on, so a
+#      symbol's win rate is available point in time
+#   2. on the last trading day of every week the picks are rebuilt as in
+#      generate_weekly_picks: today's signals with score >= min_score, win
+#      rate so far >= min_win_rate and three UP trend bars, best top_n by
+#      score then win rate
+#   3. each pick is bought at that close and held hold_bars bars, until the
+#      ATR trailing stop of run.py (close - ATR * multiplier, only ratcheting
+#      up) is closed below, or until its sleeve rebalances
+#
+# Holding periods longer than a week run in overlapping sleeves: capital is
+# split in ceil(hold_bars / 5) sleeves that rebalance in turn. Position
+# sizes are equal (1 / top_n) or ATR based (risk_per_trade of the sleeve
+# lost at the stop, capped at max_weight); the rest stays in cash. Costs
+# are cost_bps per side on every buy and sell.
+#
+# The per-trade paths (trades x bars) and the equity curve are array
+# operations; only the per-sleeve compounding walks the weeks.
+#
+#   python tools/portfolio_backtest.py [--hold_bars=10] [--sizing=atr] ...
+DEFAULTS = {
+    **RULES,                    # signal filter bands (signal_rules)
+    "top_n": 15,
+    "min_score": 70.0,
+    "min_win_rate": 0.55,
+    "hold_bars": 5,
+    "sizing": "equal",          # "equal" or "atr"
+    "risk_per_trade": 0.01,
+    "max_weight": 0.15,
+    "use_stop": True,
+    "atr_multiplier": 1.5,      # run.py DEFAULT_ATR_MULTIPLIER
+    "cost_bps": 10.0
+}
+
+BARS_PER_WEEK = 5
+TRADING_DAYS = 252
+
+
+def ffill(values):
+    # Forward fill along dates (axis 1); leading NaNs stay
+    idx = np.where(~np.isnan(values), np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return values[np.arange(values.shape[0])[:, None], idx]
+
+
+# -------------------------------
+# INPUTS (ONCE PER PANEL)
+# -------------------------------
+def prepare(panel, rules=None):
+    # Everything the simulation reads, as (symbols x dates) arrays plus the
+    # point-in-time signal table. Signals pass the `rules` filter bands;
+    # run_backtest can narrow them (not widen) without preparing again
+    rules = {**RULES, **(rules or {})}
+    close = np.asarray(panel.field("close"), dtype=float)
+    atr = np.asarray(panel.field("atr_14"), dtype=float)
+    trend = np.asarray(panel.field("trend"), dtype=float)
+
+    signals = history_signals(panel, rules=rules)
+    sym = np.array([panel.index[s] for s in signals["symbol"]], dtype=int)
+    day = panel.dates.get_indexer(signals["date"])
+
+    # outcome of every signal and the bar it matured on
+    entry_pos, exit_pos = forward_bars(panel, signals["symbol"], signals["date"], HORIZON)
+    matured = exit_pos >= 0
+    win = np.zeros(len(signals), dtype=bool)
+    win[matured] = close[sym[matured], exit_pos[matured]] > close[sym[matured], entry_pos[matured]]
+
+    # three UP trend rows in a row, counted over each symbol's complete rows
+    # like apply_rules (a missing bar or a NaN field is not a row)
+    depth = len(panel.dates)
+    complete = ~np.isnan(np.asarray(panel.values)).any(axis=2)
+    up = trend[complete] == TREND_CODES["UP"]
+    streak = up.copy()
+    streak[1:] &= up[:-1]
+    streak[2:] &= up[:-2]
+    streak[complete.cumsum(axis=1)[complete] < 3] = False
+    up3 = np.zeros(complete.shape, dtype=bool)
+    up3[complete] = streak
+
+    # last trading day of every week
+    weeks = panel.dates.to_period("W-FRI")
+    rebalance = np.flatnonzero(np.r_[weeks[1:] != weeks[:-1], True]) if depth else np.array([], dtype=int)
+
+    return {
+        "dates": panel.dates,
+        "symbols": list(panel.symbols),
+        "close": ffill(close),
+        "atr": ffill(atr),
+        "up3": up3,
+        "rules": rules,
+        "signal_sym": sym,
+        "signal_day": day,
+        "signal_score": signals["signal_score"].to_numpy(dtype=float),
+        "signal_rsi": signals["rsi"].to_numpy(dtype=float),
+        "signal_atr_pct": signals["atr"].to_numpy(dtype=float) / close[sym, day],
+        "signal_matured": matured,
+        "signal_exit": exit_pos,
+        "signal_win": win,
+        "rebalance": rebalance
+    }
+
+
+def signal_filter(data, p):
+    # Signals inside the parameters' filter bands
+    wider = (
+        p["rsi_min"] < data["rules"]["rsi_min"] or p["rsi_max"] > data["rules"]["rsi_max"]
+        or p["atr_pct_min"] < data["rules"]["atr_pct_min"] or p["atr_pct_max"] > data["rules"]["atr_pct_max"]
+    )
+    if wider:
+        raise ValueError(f"Filter bands wider than the prepared signals: {data['rules']}")
+
+    rsi, atr_pct = data["signal_rsi"], data["signal_atr_pct"]
+    return (
+        (p["rsi_min"] <= rsi) & (rsi <= p["rsi_max"])
+        & (p["atr_pct_min"] <= atr_pct) & (atr_pct <= p["atr_pct_max"])
+    )
+
+
+def win_rates(data, passed):
+    # (symbols x dates) win rate of the passed signals resolved so far;
+    # NaN before a symbol's first resolved signal
+    shape = data["close"].shape
+    resolved = np.zeros(shape)
+    wins = np.zeros(shape)
+
+    done = passed & data["signal_matured"]
+    at = (data["signal_sym"][done], data["signal_exit"][done])
+    np.add.at(resolved, at, 1.0)
+    np.add.at(wins, at, data["signal_win"][done].astype(float))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return wins.cumsum(axis=1) / resolved.cumsum(axis=1)
+
+
+# -------------------------------
+# PICKS
+# -------------------------------
+def weekly_picks(data, p):
+    # -> (cohort, symbol, day) of every pick, best first within a cohort
+    cohort_of_day = np.full(len(data["dates"]), -1)
+    cohort_of_day[data["rebalance"]] = np.arange(len(data["rebalance"]))
+
+    passed = signal_filter(data, p)
+    rates = win_rates(data, passed)
+
+    sym, day, score = data["signal_sym"], data["signal_day"], data["signal_score"]
+    cohort = cohort_of_day[day]
+    win_rate = rates[sym, day]
+
+    ok = (
+        passed
+        & (cohort >= 0)
+        & (score >= p["min_score"])
+        & (win_rate >= p["min_win_rate"])
+        & data["up3"][sym, day]
+    )
+    cohort, sym, day, score, win_rate = cohort[ok], sym[ok], day[ok], score[ok], win_rate[ok]
+
+    # best first: score, then win rate; keep top_n per cohort
+    order = np.lexsort((-win_rate, -score, cohort))
+    cohort, sym, day = cohort[order], sym[order], day[order]
+
+    first = np.r_[True, cohort[1:] != cohort[:-1]]
+    start = np.maximum.accumulate(np.where(first, np.arange(len(cohort)), 0))
+    keep = np.arange(len(cohort)) - start < p["top_n"]
+
+    return cohort[keep], sym[keep], day[keep]
+
+
+# -------------------------------
+# SIMULATION
+# -------------------------------
+def run_backtest(data, **params):
+    p = {**DEFAULTS, **params}
+    dates = data["dates"]
+    depth = len(dates)
+    close, atr = data["close"], data["atr"]
+    rebalance = data["rebalance"]
+    n_cohorts = len(rebalance)
+    cost = p["cost_bps"] / 10000.0
+
+    sleeves = max(1, math.ceil(p["hold_bars"] / BARS_PER_WEEK))
+    cohort_start = rebalance
+    cohort_end = np.r_[rebalance[sleeves:], np.full(min(sleeves, n_cohorts), depth - 1)].astype(int)
+
+    cohort, sym, t0 = weekly_picks(data, p)
+    t0 = t0.astype(int)
+
+    # ===============================
+    # POSITION SIZES
+    # ===============================
+    entry = close[sym, t0]
+    if p["sizing"] == "atr":
+        stop_pct = p["atr_multiplier"] * atr[sym, t0] / entry
+        with np.errstate(divide="ignore"):
+            weight = np.minimum(p["risk_per_trade"] / stop_pct, p["max_weight"])
+    else:
+        weight = np.full(len(sym), 1.0 / p["top_n"])
+
+    # never more than the sleeve: scale a cohort down if it adds up past 1
+    invested = np.bincount(cohort, weights=weight, minlength=n_cohorts)
+    weight = weight / np.maximum(invested, 1.0)[cohort]
+    invested = np.bincount(cohort, weights=weight, minlength=n_cohorts)
+
+    # ===============================
+    # TRADE PATHS (TRADES x BARS)
+    # ===============================
+    length = cohort_end - cohort_start
+    span = int(length.max()) + 1 if n_cohorts else 1
+    limit = cohort_end[cohort] - t0
+    steps = np.arange(span)
+    cols = np.minimum(t0[:, None] + steps, depth - 1)
+
+    path = close[sym[:, None], cols]
+    exit_h = np.minimum(limit, p["hold_bars"])
+
+    stop_exit = np.zeros(len(sym), dtype=bool)
+    if p["use_stop"] and span > 1:
+        # run.py trailing stop: close - ATR * m, ratcheted; exit on the
+        # first close below the previous bar's stop
+        stop = np.maximum.accumulate(path - atr[sym[:, None], cols] * p["atr_multiplier"], axis=1)
+        breach = path[:, 1:] < stop[:, :-1]
+        breach &= steps[1:] <= exit_h[:, None]
+        hit = breach.any(axis=1)
+        first = breach.argmax(axis=1) + 1
+        stop_exit = hit & (first < exit_h)
+        exit_h = np.where(hit, np.minimum(first, exit_h), exit_h)
+
+    exit_price = path[np.arange(len(sym)), exit_h]
+    gross = path / entry[:, None]
+    held = steps[None, :] < exit_h[:, None]
+    value = np.where(held, gross, (exit_price / entry * (1 - cost))[:, None]) * (1 - cost)
+    trade_return = (exit_price / entry) * (1 - cost) ** 2 - 1
+
+    # ===============================
+    # COHORTS -> SLEEVES -> EQUITY
+    # ===============================
+    # cohort growth path: cash + sum of weight * position value
+    growth = np.zeros((n_cohorts, span))
+    np.add.at(growth, cohort, weight[:, None] * value)
+    growth += (1 - invested)[:, None]
+
+    final = growth[np.arange(n_cohorts), length]
+
+    capital = np.zeros(n_cohorts)
+    for s in range(sleeves):
+        idx = np.arange(s, n_cohorts, sleeves)
+        capital[idx] = np.cumprod(np.r_[1.0, final[idx][:-1]]) / sleeves
+
+    sleeve_value = np.full((sleeves, depth), 1.0 / sleeves)
+    for w in range(n_cohorts):
+        s = w % sleeves
+        last = depth if cohort_end[w] == depth - 1 else cohort_end[w]
+        n = last - cohort_start[w]
+        sleeve_value[s, cohort_start[w]:last] = capital[w] * growth[w, :n]
+
+    equity = sleeve_value.sum(axis=0)
+    drawdown = equity / np.maximum.accumulate(equity) - 1 if depth else equity
+
+    # ===============================
+    # TURNOVER
+    # ===============================
+    bought = capital[cohort] * weight
+    sold = capital[cohort] * weight * exit_price / entry
+    traded = np.zeros(depth)
+    np.add.at(traded, t0, bought)
+    np.add.at(traded, t0 + exit_h, sold)
+    turnover = traded / (2 * equity)
+
+    # ===============================
+    # REPORT
+    # ===============================
+    start = int(rebalance[0]) if n_cohorts else 0
+    curve = pd.DataFrame({
+        "date": dates[start:],
+        "equity": equity[start:],
+        "drawdown": drawdown[start:],
+        "turnover": turnover[start:]
+    })
+
+    trades = pd.DataFrame({
+        "entry_date": dates[t0],
+        "exit_date": dates[t0 + exit_h],
+        "symbol": np.array(data["symbols"], dtype=object)[sym],
+        "weight": weight,
+        "entry_price": entry,
+        "exit_price": exit_price,
+        "return": trade_return,
+        "exit": np.where(stop_exit, "STOP", np.where(exit_h == p["hold_bars"], "HOLD", "REBALANCE"))
+    })
+
+    years = max(len(curve) - 1, 1) / TRADING_DAYS
+    daily = np.diff(curve["equity"].to_numpy()) / curve["equity"].to_numpy()[:-1] if len(curve) > 1 else np.zeros(1)
+    total = curve["equity"].iloc[-1] / curve["equity"].iloc[0] - 1 if len(curve) else 0.0
+
+    summary = {
+        **{k: p[k] for k in DEFAULTS},
+        "start": curve["date"].iloc[0].date().isoformat() if len(curve) else None,
+        "end": curve["date"].iloc[-1].date().isoformat() if len(curve) else None,
+        "weeks": n_cohorts,
+        "trades": len(trades),
+        "total_return": total,
+        "cagr": (1 + total) ** (1 / years) - 1,
+        "volatility": daily.std() * math.sqrt(TRADING_DAYS),
+        "sharpe": daily.mean() / daily.std() * math.sqrt(TRADING_DAYS) if daily.std() > 0 else 0.0,
+        "max_drawdown": curve["drawdown"].min() if len(curve) else 0.0,
+        "annual_turnover": curve["turnover"].sum() / years,
+        "win_rate": (trades["return"] > 0).mean() if len(trades) else 0.0,
+        "avg_trade_return": trades["return"].mean() if len(trades) else 0.0,
+        "stop_exits": stop_exit.mean() if len(trades) else 0.0,
+        "avg_exposure": invested.mean() if n_cohorts else 0.0
+    }
+
+    return summary, curve, trades
+
+
+# -------------------------------
+# SWEEP WORKER
+# -------------------------------
+# Parameter sweeps call backtest_point through parallel_map. Each worker
+# process prepares once per filter band, from the shared read-only panel
+# memmap (the caller makes sure the panel is up to date).
+_prepared = None
+
+
+def backtest_point(item):
+    # item = (params, rules) -> run_backtest summary of params, on signals
+    # prepared with the (widest) rules bands
+    global _prepared
+    params, rules = item
+
+    if _prepared is None or _prepared["rules"] != {**RULES, **rules}:
+        _prepared = prepare(Panel("features"), rules)
+
+    summary, _, _ = run_backtest(_prepared, **params)
+    return summary
+
+
+def parse_params(args):
+    # --name=value overrides of DEFAULTS, cast to the default's type
+    params = {}
+    for arg in args:
+        if not arg.startswith("--") or "=" not in arg:
+            continue
+        name, value = arg[2:].split("=", 1)
+        if name not in DEFAULTS:
+            raise ValueError(f"Unknown parameter: {name}")
+        default = DEFAULTS[name]
+        if isinstance(default, bool):
+            params[name] = value.lower() in ("1", "true", "yes")
+        elif isinstance(default, int):
+            params[name] = float(value) if "." in value else int(value)
+        else:
+            params[name] = type(default)(value)
+    return params
+
+
+if __name__ == "__main__":
+    params = parse_params(sys.argv[1:])
+
+    panel = open_panel("features")
+    print(f"📜 BACKTESTING WEEKLY PICKS OVER {len(panel.dates)} DATES x {len(panel.symbols)} STOCKS")
+
+    summary, curve, trades = run_backtest(prepare(panel), **params)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with ReportWriter(OUT_FILE) as report:
+        report.write_frame("Summary", pd.DataFrame([summary]))
+        report.write_frame("Equity", curve)
+        report.write_frame("Trades", trades)
+
+    print("📊 PORTFOLIO BACKTEST COMPLETE")
+    print(f"📈 TOTAL RETURN : {summary['total_return'] * 100:.2f}%  (CAGR {summary['cagr'] * 100:.2f}%)")
+    print(f"📉 MAX DRAWDOWN : {summary['max_drawdown'] * 100:.2f}%")
+    print(f"🔁 TURNOVER     : {summary['annual_turnover']:.1f}x per year")
+    print(f"🧾 TRADES       : {summary['trades']} (win rate {summary['win_rate'] * 100:.1f}%, {summary['stop_exits'] * 100:.1f}% stopped out)")
@@ -0,0 +1,208 @@
+import os
+import sys
+import zlib
+import numpy as np
+import pandas as pd
+from market_data import get_session
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+
+PRICE_DIR = os.path.join(BASE_DIR, "data", "prices")
+ELIGIBLE_FILE = os.path.join(BASE_DIR, "state", "eligible_stocks_daily.csv")
+
+# ===============================
+# CONFIG (ONE SWITCH FOR EVERY FETCHING TOOL)
+# ===============================
+# yfinance  -> live Yahoo Finance
+# replay    -> bars from market_ai/data/prices/*.csv, cut at MARKET_AI_AS_OF
+# synthetic -> deterministic random walks, MARKET_AI_SYNTHETIC_DAYS bars each
+PRICE_SOURCE = os.environ.get("MARKET_AI_PRICE_SOURCE", "yfinance")
+AS_OF = os.environ.get("MARKET_AI_AS_OF")
+SYNTHETIC_DAYS = int(os.environ.get("MARKET_AI_SYNTHETIC_DAYS", "750"))
+SYNTHETIC_SEED = int(os.environ.get("MARKET_AI_SYNTHETIC_SEED", "0"))
+
+FIELDS = ["Adj Close", "Close", "High", "Low", "Open", "Volume"]
+
+# ===============================
+# HELPERS
+# ===============================
+def period_start(period, end):
+    # yfinance style periods: "365d", "4wk", "6mo", "2y"
+    for unit, offset in [("wk", "weeks"), ("mo", "months"), ("d", "days"), ("y", "years")]:
+        if period.endswith(unit):
+            return end - pd.DateOffset(**{offset: int(period[:-len(unit)])})
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def as_yfinance_frame(frames):
+    # {ticker: DataFrame[FIELDS]} -> yf.download layout with (Price, Ticker) columns
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, axis=1)
+    df.columns = df.columns.swaplevel(0, 1)
+    df.columns.names = ["Price", "Ticker"]
+    df.index.name = "Date"
+    return df.sort_index().sort_index(axis=1)
+
+
+class FrameSource:
+    # Shared download() for the offline sources; subclasses provide bars()
+
+    def __init__(self, as_of=None):
+        self.as_of = pd.Timestamp(as_of) if as_of else pd.Timestamp.today().normalize()
+
+    def download(self, tickers, period=None, start=None, interval="1d",
+                 auto_adjust=True, **kwargs):
+        if interval != "1d":
+            raise ValueError(f"{type(self).__name__} only serves daily bars")
+
+        if isinstance(tickers, str):
+            tickers = [tickers]
+
+        if start is not None:
+            start = pd.Timestamp(start)
+        elif period is not None:
+            start = period_start(period, self.as_of)
+
+        frames = {}
+        for ticker in tickers:
+            df = self.bars(ticker)
+            if df is None:
+                continue
+
+            df = df[df.index <= self.as_of]
+            if start is not None:
+                df = df[df.index >= start]
+
+            if auto_adjust:
+                ratio = df["Adj Close"] / df["Close"]
+                df = df.drop(columns="Adj Close")
+                for col in ["Open", "High", "Low", "Close"]:
+                    df[col] = df[col] * ratio
+
+            frames[ticker] = df
+
+        return as_yfinance_frame(frames)
+
+
+# ===============================
+# YFINANCE (LIVE)
+# ===============================
+class YFinanceSource:
+    remote = True
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def download(self, tickers, **kwargs):
+        import yfinance as yf
+        return yf.download(tickers, progress=False, session=self.session, **kwargs)
+
+    def market_cap(self, yahoo_symbol):
+        import yfinance as yf
+        return yf.Ticker(yahoo_symbol, session=self.session).fast_info.get("marketCap", None)
+
+
+# ===============================
+# REPLAY (OFFLINE SNAPSHOT)
+# ===============================
+class ReplaySource(FrameSource):
+
+    def __init__(self, price_dir=PRICE_DIR, as_of=None):
+        super().__init__(as_of)
+        self.price_dir = price_dir
+        self.market_caps = {}
+
+        if os.path.exists(ELIGIBLE_FILE):
+            eligible = pd.read_csv(ELIGIBLE_FILE)
+            self.market_caps = dict(zip(eligible["yahoo_symbol"], eligible["market_cap_cr"] * 1e7))
+
+    def bars(self, ticker):
+        path = os.path.join(self.price_dir, f"{ticker.split('.')[0]}.csv")
+        if not os.path.exists(path):
+            return None
+
+        df = pd.read_csv(path)
+        df.columns = [c.split("_")[0].title() for c in df.columns]
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date")[FIELDS]
+
+    def market_cap(self, yahoo_symbol):
+        return self.market_caps.get(yahoo_symbol)
+
+
+# ===============================
+# SYNTHETIC (N SYMBOLS x T DAYS)
+# ===============================
+class SyntheticSource(FrameSource):
+
+    def __init__(self, days=SYNTHETIC_DAYS, as_of=None, seed=SYNTHETIC_SEED):
+        super().__init__(as_of)
+        self.days = days
+        self.seed = seed
+
+    def rng(self, ticker):
+        return np.random.default_rng([zlib.crc32(ticker.encode()), self.seed])
+
+    def bars(self, ticker):
+        rng = self.rng(ticker)
+        dates = pd.bdate_range(end=self.as_of, periods=self.days, name="Date")
+
+        start = rng.uniform(50, 5000)
+        close = start * np.exp(np.cumsum(rng.normal(0.0003, 0.018, self.days)))
+        open_ = close * np.exp(rng.normal(0, 0.006, self.days))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, self.days))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, self.days))
+        volume = rng.integers(1_000, 5_000_000, self.days)
+
+        return pd.DataFrame({
+            "Adj Close": close,
+            "Close": close,
+            "High": high,
+            "Low": low,
+            "Open": open_,
+            "Volume": volume
+        }, index=dates)
+
+    def market_cap(self, yahoo_symbol):
+        # ₹100 Cr .. ₹10 lakh Cr, log-uniform
+        return float(10 ** self.rng(yahoo_symbol).uniform(9, 13))
+
+
+def synthetic_universe(n):
+    symbols = [f"SYN{i:04d}" for i in range(n)]
+    return pd.DataFrame({
+        "symbol": symbols,
+        "yahoo_symbol": [f"{s}.NS" for s in symbols]
+    })
+
+
+# ===============================
+# FACTORY
+# ===============================
+def get_price_source(name=None):
+    name = (name or PRICE_SOURCE).lower()
+
+    if name == "yfinance":
+        return YFinanceSource(session=get_session())
+    if name == "replay":
+        return ReplaySource(as_of=AS_OF)
+    if name == "synthetic":
+        return SyntheticSource(as_of=AS_OF)
+
+    raise ValueError(f"Unknown price source: {name}")
+
+
+if __name__ == "__main__":
+    # python tools/price_sources.py <N> <universe.csv>
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.join(BASE_DIR, "universe", "synthetic.csv")
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    synthetic_universe(n).to_csv(out, index=False)
+
+    print(f"✅ SYNTHETIC UNIVERSE: {n} symbols -> {out}")
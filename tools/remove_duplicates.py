@@ -1,17 +1,45 @@
 import os
+import sys
 import pandas as pd
+from manifest import Manifest
 
 DATA_DIR = "market_ai/data/prices"
 
+# Files unchanged since the last pass are skipped; --force rechecks all
+FORCE = "--force" in sys.argv
+manifest = Manifest("remove_duplicates", force=FORCE)
+
+checked = 0
+cleaned = 0
+unchanged = 0
+
 for file in os.listdir(DATA_DIR):
     if not file.endswith(".csv"):
         continue
 
     path = f"{DATA_DIR}/{file}"
+
+    if not manifest.changed(file, inputs=[path]):
+        unchanged += 1
+        continue
+
     df = pd.read_csv(path)
 
-    if "date" in df.columns:
-        df = df.drop_duplicates(subset=["date"], keep="last")
-        df.to_csv(path, index=False)
+    # price CSVs name the column date_ (flattened yfinance columns)
+    date_col = next((c for c in ("date_", "date") if c in df.columns), None)
+
+    if date_col is not None:
+        deduped = df.drop_duplicates(subset=[date_col], keep="last")
+        if len(deduped) < len(df):
+            deduped.to_csv(path, index=False)
+            cleaned += 1
+
+    manifest.record(file, inputs=[path])
+    checked += 1
+
+manifest.save()
 
 print("✅ Duplicate dates removed")
+print(f"🔎 CHECKED   : {checked}")
+print(f"🧹 CLEANED   : {cleaned}")
+print(f"⏸️ UNCHANGED : {unchanged}")
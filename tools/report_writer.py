@@ -0,0 +1,97 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# ===============================
+# STREAMING EXCEL REPORTS
+# ===============================
+# Every workbook the pipeline produces goes through ReportWriter: openpyxl in
+# write-only mode (the one engine in requirements.txt). Rows are streamed to
+# each sheet as they are produced and nothing is kept in memory, so a report
+# costs the same however many sheets or rows it grows. Sheets can be filled in
+# any order (e.g. a summary sheet first in the workbook but written last).
+
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(*(Side(style="thin"),) * 4)
+HEADER_ALIGN = Alignment(horizontal="center", vertical="top")
+
+
+def clean(value):
+    # numpy scalars -> python; NaN / NaT / NA become empty cells, like
+    # DataFrame.to_excel
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    elif isinstance(value, np.generic):
+        value = value.item()
+
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class ReportWriter:
+
+    def __init__(self, path):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheets = {}
+        self.columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
+
+    def sheet(self, name, columns):
+        ws = self.workbook.create_sheet(title=name)
+
+        header = []
+        for c in columns:
+            cell = WriteOnlyCell(ws, value=c)
+            cell.font = HEADER_FONT
+            cell.border = HEADER_BORDER
+            cell.alignment = HEADER_ALIGN
+            header.append(cell)
+        ws.append(header)
+
+        self.sheets[name] = ws
+        self.columns[name] = list(columns)
+        return ws
+
+    def append(self, name, row):
+        # row: dict keyed by column, or a sequence in column order
+        if isinstance(row, dict):
+            row = [row.get(c) for c in self.columns[name]]
+        self.sheets[name].append([clean(v) for v in row])
+
+    def write_rows(self, name, columns, rows):
+        self.sheet(name, columns)
+        n = 0
+        for row in rows:
+            self.append(name, row)
+            n += 1
+        return n
+
+    def write_frame(self, name, df):
+        return self.write_rows(
+            name,
+            [str(c) for c in df.columns],
+            df.itertuples(index=False, name=None)
+        )
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        # write-only workbooks can be saved once; write next to the target
+        # and swap so a reader never opens a half-written file
+        tmp = self.path + ".tmp"
+        self.workbook.save(tmp)
+        os.replace(tmp, self.path)
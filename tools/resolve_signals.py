@@ -0,0 +1,29 @@
+import sys
+from panel import open_panel
+from signal_store import SignalStore
+from signal_rules import resolve_pending
+
+# ===============================
+# FORWARD RETURN RESOLVER
+# ===============================
+# Fills forward_return_5d / win of the logged signals whose horizon has
+# elapsed (daily_learning_metrics does this on every run too).
+#
+#   python tools/resolve_signals.py             resolve matured signals
+#   python tools/resolve_signals.py --requeue   recompute every logged signal
+#                                               (e.g. after prices were
+#                                               restated)
+
+REQUEUE = "--requeue" in sys.argv
+
+panel = open_panel("features")
+store = SignalStore()
+
+if REQUEUE:
+    print(f"🔁 REQUEUED {store.requeue_all()} SIGNALS")
+
+resolved = resolve_pending(store, panel)
+store.commit()
+
+print(f"🎯 RESOLVED {resolved} MATURED SIGNALS ({store.pending_count()} pending)")
+store.close()
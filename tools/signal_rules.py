@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from panel import TREND_CODES, TREND_LABELS
+
+# ===============================
+# DAILY SIGNAL RULES (CROSS-SECTIONAL)
+# ===============================
+# Filter + score of every symbol's latest bar in one pass over the features
+# panel. Each symbol is judged on its own complete rows (no NaN in any
+# field), exactly like the per-symbol dropna() version: the last row is
+# today and the rows before it feed the trend streak. Returns one row per
+# qualifying symbol. history_signals runs the same rules over every
+# historical row at once (signal log backfill).
+#
+# Forward returns are not known when a signal is scored: resolve_pending
+# fills them in HORIZON bars later from the signal store's pending queue.
+MIN_BARS = 220
+LOOKBACK = 6      # a symbol needs this many complete rows to be scored
+HORIZON = 5
+
+SIGNAL_COLUMNS = ["symbol", "signal_score", "rsi", "atr", "trend", "bar_date"]
+
+# filter bands (inclusive); the parameter sweep overrides them
+RULES = {
+    "rsi_min": 45,
+    "rsi_max": 65,
+    "atr_pct_min": 0.01,
+    "atr_pct_max": 0.06
+}
+
+
+def last_complete_rows(panel, idx, n):
+    # -> (symbols x n x fields) array of each symbol's last n complete rows,
+    # oldest first, a mask of the symbols that have n of them, each symbol's
+    # bar count and the date position of its last complete row
+    values = np.asarray(panel.values[idx])
+    complete = ~np.isnan(values).any(axis=2)
+
+    # rank 1 = last complete row, 2 = the one before, ...
+    rank = complete[:, ::-1].cumsum(axis=1)[:, ::-1]
+    ok = rank[:, 0] >= n if values.shape[1] else np.zeros(len(idx), dtype=bool)
+
+    rows = np.full((len(idx), n, values.shape[2]), np.nan)
+    sym = np.arange(len(idx))
+    positions = [(complete & (rank == k)).argmax(axis=1) for k in range(1, n + 1)]
+    for k, pos in enumerate(positions, 1):
+        rows[:, n - k] = values[sym, pos]
+    rows[~ok] = np.nan
+
+    bars = (~np.isnan(values).all(axis=2)).sum(axis=1)
+    return rows, ok, bars, positions[0]
+
+
+def apply_rules(field, bars, ok, rules=None):
+    # field(name, back) -> array of the field `back` complete rows before the
+    # scored row (one entry per candidate). -> (keep mask, signal columns)
+    rules = {**RULES, **(rules or {})}
+    close = field("close", 0)
+    ema_20, ema_50, ema_200 = field("ema_20", 0), field("ema_50", 0), field("ema_200", 0)
+    rsi, atr = field("rsi_14", 0), field("atr_14", 0)
+
+    up = TREND_CODES["UP"]
+    trend_1 = field("trend", 0) == up
+    trend_2 = field("trend", 1) == up
+    trend_3 = field("trend", 2) == up
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # ===============================
+        # SIGNAL FILTER
+        # ===============================
+        ema_stack_ok = (ema_20 > ema_50) & (ema_50 > ema_200)
+        rsi_ok = (rules["rsi_min"] <= rsi) & (rsi <= rules["rsi_max"])
+
+        atr_pct = atr / close
+        atr_ok = (rules["atr_pct_min"] <= atr_pct) & (atr_pct <= rules["atr_pct_max"])
+
+        keep = (bars >= MIN_BARS) & ok & ema_stack_ok & rsi_ok & atr_ok & trend_1 & trend_2
+
+        # ===============================
+        # SIGNAL SCORE
+        # ===============================
+        ema_score = np.clip(((ema_20 - ema_200) / ema_200) * 300, 0, 30)
+        rsi_score = np.clip(25 - np.abs(rsi - 55) * 1.25, 0, 25)
+        atr_score = np.clip(25 - np.abs(atr_pct - 0.03) * 500, 0, 25)
+        trend_score = np.where(trend_1 & trend_2 & trend_3, 20, 12)
+
+        signal_score = np.round(ema_score + rsi_score + atr_score + trend_score, 1)
+
+    return keep, {
+        "signal_score": signal_score[keep],
+        "rsi": rsi[keep],
+        "atr": atr[keep],
+        "trend": [TREND_LABELS[c] for c in field("trend", 0)[keep]]
+    }
+
+
+def score_signals(panel, symbols=None):
+    # Today's signals: each symbol's latest complete row
+    symbols = list(panel.symbols if symbols is None else symbols)
+    if not symbols or not len(panel.dates):
+        return pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    idx = [panel.index[s] for s in symbols]
+    rows, ok, bars, last = last_complete_rows(panel, idx, LOOKBACK)
+
+    def field(name, back):
+        return rows[:, LOOKBACK - 1 - back, panel.fields.index(name)]
+
+    keep, columns = apply_rules(field, bars, ok)
+
+    return pd.DataFrame(
+        {"symbol": np.array(symbols, dtype=object)[keep], **columns, "bar_date": panel.dates[last[keep]]},
+        columns=SIGNAL_COLUMNS
+    )
+
+
+def history_signals(panel, symbols=None, rules=None):
+    # Point-in-time replay: every complete row of every symbol is scored as if
+    # it had been the latest bar, using only the rows up to it. -> signals of
+    # all dates (date = the bar's date), in date then symbol order
+    symbols = list(panel.symbols if symbols is None else symbols)
+    if not symbols or not len(panel.dates):
+        return pd.DataFrame(columns=["date"] + SIGNAL_COLUMNS)
+
+    values = np.asarray(panel.values[[panel.index[s] for s in symbols]])
+    missing = np.isnan(values)
+    complete = ~missing.any(axis=2)
+
+    # one entry per complete row, symbol by symbol in date order, so the row
+    # `back` complete rows earlier is `back` entries earlier
+    sym_i, date_i = np.nonzero(complete)
+    flat = values[complete]
+    rank = complete.cumsum(axis=1)[complete]
+    bars = (~missing.all(axis=2)).cumsum(axis=1)[complete]
+
+    def field(name, back):
+        col = flat[:, panel.fields.index(name)]
+        out = np.full(len(col), np.nan)
+        out[back:] = col[:len(col) - back]
+        out[rank <= back] = np.nan
+        return out
+
+    keep, columns = apply_rules(field, bars, rank >= LOOKBACK, rules)
+
+    df = pd.DataFrame({
+        "date": panel.dates[date_i[keep]],
+        "symbol": np.array(symbols, dtype=object)[sym_i[keep]],
+        **columns,
+        "bar_date": panel.dates[date_i[keep]]
+    }, columns=["date"] + SIGNAL_COLUMNS)
+
+    order = np.lexsort((sym_i[keep], date_i[keep]))
+    return df.iloc[order].reset_index(drop=True)
+
+
+# ===============================
+# FORWARD RETURN RESOLUTION
+# ===============================
+def forward_bars(panel, symbols, bar_dates, horizon=HORIZON):
+    # Batched lookup: date positions of each signal's bar (the symbol's last
+    # close on or before bar_date) and of the bar `horizon` of the symbol's
+    # own bars later; -1 where the symbol is unknown or the horizon has not
+    # elapsed yet
+    symbols = np.asarray(symbols, dtype=object)
+    entry = np.full(len(symbols), -1)
+    exit_ = np.full(len(symbols), -1)
+
+    known = np.array([s in panel for s in symbols], dtype=bool)
+    pos = panel.dates.searchsorted(pd.DatetimeIndex(bar_dates), side="right") - 1
+    known &= pos >= 0
+    if not known.any():
+        return entry, exit_
+
+    uniq, inv = np.unique(symbols[known], return_inverse=True)
+    close = np.asarray(panel.field("close")[[panel.index[s] for s in uniq]])
+    depth = close.shape[1]
+
+    # count[u, d] = bars of symbol u up to date d; rows offset so the whole
+    # array is one sorted sequence for a single searchsorted
+    count = (~np.isnan(close)).cumsum(axis=1)
+    flat = (count + np.arange(len(uniq))[:, None] * (depth + 1)).ravel()
+
+    start = count[inv, pos[known]]
+    base = inv * (depth + 1)
+
+    def position(n, ok):
+        at = np.searchsorted(flat, base + n, side="left") - inv * depth
+        return np.where(ok, at, -1)
+
+    entry[known] = position(start, start > 0)
+    exit_[known] = position(start + horizon, (start > 0) & (start + horizon <= count[inv, -1]))
+    return entry, exit_
+
+
+def forward_closes(panel, symbols, bar_dates, horizon=HORIZON):
+    # Close on each signal's bar and `horizon` bars later (NaN: not available)
+    entry_pos, exit_pos = forward_bars(panel, symbols, bar_dates, horizon)
+    sym = np.array([panel.index.get(s, 0) for s in symbols], dtype=int)
+    close = panel.field("close")
+
+    def close_at(pos):
+        ok = pos >= 0
+        out = np.full(len(pos), np.nan)
+        out[ok] = close[sym[ok], pos[ok]]
+        return out
+
+    return close_at(entry_pos), close_at(exit_pos)
+
+
+def resolve_pending(store, panel, horizon=HORIZON):
+    # Fills forward_return_5d / win of the pending signals whose horizon has
+    # elapsed. Only signals scored at least `horizon` panel dates ago can be
+    # due, so only those are read. -> number resolved (caller commits)
+    if len(panel.dates) <= horizon:
+        return 0
+
+    due = store.pending(until=panel.dates[-1 - horizon])
+    if due.empty:
+        return 0
+
+    entry, exit_ = forward_closes(panel, due["symbol"], due["bar_date"], horizon)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = (exit_ - entry) / entry
+
+    ok = np.isfinite(ret)
+    return store.resolve(zip(due["symbol"][ok], due["date"][ok], ret[ok]))
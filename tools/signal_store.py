@@ -0,0 +1,484 @@
+import os
+import sys
+import sqlite3
+import numpy as np
+import pandas as pd
+from report_writer import ReportWriter
+
+# ===============================
+# PATHS
+# ===============================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
+
+REPORT_DIR = os.path.join(BASE_DIR, "reports")
+SIGNAL_DB = os.path.join(BASE_DIR, "state", "signals.db")
+
+# ===============================
+# SIGNAL LOG + DAILY SUMMARY (SQLITE, WAL)
+# ===============================
+# System of record for what used to be reports/signal_log.xlsx and
+# reports/daily_learning.xlsx. Rows are only ever appended (O(today) per run)
+# and reads filter on the indexed date column; the workbooks are an optional
+# export (`python tools/signal_store.py export`).
+#
+# Signals are logged with forward_return_5d / win left NULL and queued in
+# `pending` by (symbol, signal date) with the bar they were scored on; the
+# resolver (signal_rules.resolve_pending) fills them in once that bar is
+# HORIZON bars old, touching only the signals that matured.
+#
+# Every resolution also folds the newly resolved signals into running
+# aggregates (count, wins, sum / sum of squares of returns, sum of scores)
+# per symbol and per score bucket, over three spans:
+#   all      the whole log
+#   rolling  signals dated within ROLLING_DAYS of the newest resolved one
+#            (signals leaving the window are subtracted as it moves)
+#   decay    weights halving every DECAY_HALF_LIFE_DAYS
+# so readers get per-symbol / per-bucket stats in O(symbols).
+ROLLING_DAYS = 90
+DECAY_HALF_LIFE_DAYS = 30
+AGGREGATE_SPANS = ["all", "rolling", "decay"]
+
+SIGNAL_COLUMNS = [
+    "date", "symbol", "signal_score", "forward_return_5d", "win", "rsi", "atr", "trend"
+]
+
+SUMMARY_COLUMNS = [
+    "date", "stocks_evaluated", "avg_signal_score", "win_rate",
+    "avg_forward_return", "avg_atr", "status"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS signals (
+    date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    signal_score REAL,
+    forward_return_5d REAL,
+    win INTEGER,
+    rsi REAL,
+    atr REAL,
+    trend TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_signals_date ON signals (date);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol ON signals (symbol);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol_date ON signals (symbol, date);
+CREATE TABLE IF NOT EXISTS pending (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    bar_date TEXT NOT NULL,
+    PRIMARY KEY (symbol, date)
+);
+CREATE INDEX IF NOT EXISTS idx_pending_bar_date ON pending (bar_date);
+CREATE TABLE IF NOT EXISTS aggregates (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    span TEXT NOT NULL,
+    n REAL,
+    wins REAL,
+    sum_return REAL,
+    sum_sq_return REAL,
+    sum_score REAL,
+    PRIMARY KEY (scope, key, span)
+);
+CREATE TABLE IF NOT EXISTS daily_summary (
+    date TEXT NOT NULL,
+    stocks_evaluated INTEGER,
+    avg_signal_score REAL,
+    win_rate REAL,
+    avg_forward_return REAL,
+    avg_atr REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_summary_date ON daily_summary (date);
+"""
+
+
+def iso_date(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def optional(value, cast):
+    return None if value is None or pd.isna(value) else cast(value)
+
+
+def score_bucket(score):
+    # Score buckets of the signal analysis (vectorized)
+    score = np.asarray(score, dtype=float)
+    return np.select(
+        [score > 75, score >= 60],
+        ["HIGH (>75)", "MEDIUM (60–75)"],
+        "LOW (<60)"
+    )
+
+
+def date_filter(start, end):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(iso_date(start))
+    if end is not None:
+        clauses.append("date <= ?")
+        params.append(iso_date(end))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class SignalStore:
+
+    def __init__(self, path=SIGNAL_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # scratch tables of one resolve() call
+        self.conn.execute("CREATE TEMP TABLE due (symbol TEXT, date TEXT, ret REAL)")
+        self.conn.execute("CREATE TEMP TABLE just_resolved (id INTEGER PRIMARY KEY)")
+        self.conn.commit()
+
+        # Existing workbooks are imported the first time the store is opened
+        self.migrate(REPORT_DIR)
+
+        # Aggregates are built once from what is already resolved, then kept
+        # up to date by resolve()
+        if self.get_meta("aggregates") is None:
+            self.accumulate(self.signals(resolved=True))
+            self.set_meta("aggregates", pd.Timestamp.now().isoformat(timespec="seconds"))
+            self.commit()
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    # -------------------------------
+    # APPEND
+    # -------------------------------
+    def append_signals(self, records):
+        # Records without forward_return_5d are stored unresolved (NULL)
+        self.conn.executemany(
+            f"INSERT INTO signals VALUES ({', '.join('?' * len(SIGNAL_COLUMNS))})",
+            [
+                (iso_date(r["date"]), r["symbol"], float(r["signal_score"]),
+                 optional(r.get("forward_return_5d"), float),
+                 optional(r.get("win"), lambda w: int(bool(w))),
+                 float(r["rsi"]), float(r["atr"]), r["trend"])
+                for r in records
+            ]
+        )
+
+    def queue_pending(self, records):
+        # records: symbol, date (as logged), bar_date (bar it was scored on)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO pending VALUES (?, ?, ?)",
+            [(r["symbol"], iso_date(r["date"]), iso_date(r["bar_date"])) for r in records]
+        )
+
+    def requeue_all(self):
+        # Every logged signal back to unresolved, scored on the bar of its
+        # own date (corrects rows written before the queue existed)
+        self.conn.execute("UPDATE signals SET forward_return_5d = NULL, win = NULL")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO pending SELECT DISTINCT symbol, date, date FROM signals"
+        )
+        self.conn.execute("DELETE FROM aggregates")
+        self.conn.execute("DELETE FROM meta WHERE key = 'aggregates_as_of'")
+        return self.pending_count()
+
+    def resolve(self, rows):
+        # rows: (symbol, date, forward_return) of matured signals. Only log
+        # rows still unresolved are filled, so each enters the aggregates once
+        rows = [(s, iso_date(d), float(r)) for s, d, r in rows]
+
+        self.conn.execute("DELETE FROM due")
+        self.conn.executemany("INSERT INTO due VALUES (?, ?, ?)", rows)
+
+        self.conn.execute("DELETE FROM just_resolved")
+        self.conn.execute(
+            "INSERT INTO just_resolved SELECT s.rowid FROM signals s JOIN due d "
+            "ON s.symbol = d.symbol AND s.date = d.date WHERE s.forward_return_5d IS NULL"
+        )
+        self.conn.execute(
+            "UPDATE signals SET forward_return_5d = (SELECT d.ret FROM due d "
+            "WHERE d.symbol = signals.symbol AND d.date = signals.date) "
+            "WHERE rowid IN (SELECT id FROM just_resolved)"
+        )
+        self.conn.execute(
+            "UPDATE signals SET win = forward_return_5d > 0 "
+            "WHERE rowid IN (SELECT id FROM just_resolved)"
+        )
+        self.conn.execute(
+            "DELETE FROM pending WHERE (symbol, date) IN (SELECT symbol, date FROM due)"
+        )
+
+        self.accumulate(self.read_signals(
+            "SELECT date, symbol, signal_score, forward_return_5d, win FROM signals "
+            "WHERE rowid IN (SELECT id FROM just_resolved)"
+        ))
+        return len(rows)
+
+    # -------------------------------
+    # RUNNING AGGREGATES
+    # -------------------------------
+    def read_signals(self, sql, params=()):
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def accumulate(self, new):
+        # new: resolved signals (date, symbol, signal_score, forward_return_5d,
+        # win) not yet in the aggregates
+        if new.empty:
+            return
+
+        old = self.get_meta("aggregates_as_of")
+        old = None if old is None else pd.Timestamp(old)
+        as_of = new["date"].max() if old is None else max(old, new["date"].max())
+
+        if old is not None and as_of > old:
+            # everything decays to the new reference date
+            factor = 0.5 ** ((as_of - old).days / DECAY_HALF_LIFE_DAYS)
+            self.conn.execute(
+                "UPDATE aggregates SET n = n * ?, wins = wins * ?, sum_return = sum_return * ?, "
+                "sum_sq_return = sum_sq_return * ?, sum_score = sum_score * ? WHERE span = 'decay'",
+                [factor] * 5
+            )
+
+            # resolved signals that fell out of the rolling window (the ones
+            # being added now are weighted below instead)
+            expired = self.read_signals(
+                "SELECT date, symbol, signal_score, forward_return_5d, win FROM signals "
+                "WHERE forward_return_5d IS NOT NULL AND date > ? AND date <= ? "
+                "AND rowid NOT IN (SELECT id FROM just_resolved)",
+                [iso_date(old - pd.Timedelta(days=ROLLING_DAYS)),
+                 iso_date(as_of - pd.Timedelta(days=ROLLING_DAYS))]
+            )
+            self.add_weighted(expired, "rolling", -np.ones(len(expired)))
+
+        age = (as_of - new["date"]).dt.days.to_numpy()
+        self.add_weighted(new, "all", np.ones(len(new)))
+        self.add_weighted(new, "rolling", (age < ROLLING_DAYS).astype(float))
+        self.add_weighted(new, "decay", 0.5 ** (age / DECAY_HALF_LIFE_DAYS))
+
+        self.set_meta("aggregates_as_of", iso_date(as_of))
+
+    def add_weighted(self, df, span, weight):
+        if df.empty:
+            return
+
+        ret = df["forward_return_5d"].to_numpy(dtype=float)
+        parts = pd.DataFrame({
+            "symbol": df["symbol"].to_numpy(),
+            "bucket": score_bucket(df["signal_score"]),
+            "n": weight,
+            "wins": weight * df["win"].to_numpy(dtype=float),
+            "sum_return": weight * ret,
+            "sum_sq_return": weight * ret * ret,
+            "sum_score": weight * df["signal_score"].to_numpy(dtype=float)
+        })
+
+        for scope in ("symbol", "bucket"):
+            sums = parts.groupby(scope)[["n", "wins", "sum_return", "sum_sq_return", "sum_score"]].sum()
+            self.conn.executemany(
+                "INSERT INTO aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (scope, key, span) DO UPDATE SET "
+                "n = n + excluded.n, wins = wins + excluded.wins, "
+                "sum_return = sum_return + excluded.sum_return, "
+                "sum_sq_return = sum_sq_return + excluded.sum_sq_return, "
+                "sum_score = sum_score + excluded.sum_score",
+                [(scope, key, span, *map(float, row)) for key, row in zip(sums.index, sums.to_numpy())]
+            )
+
+    def aggregates(self, scope="symbol", span="all"):
+        # -> one row per symbol (or score bucket): signals, win_rate,
+        # avg_return, std_return, avg_score. "rolling" and "decay" are
+        # anchored at the newest resolved signal date (meta aggregates_as_of),
+        # not at today: the window only moves when newer signals resolve
+        df = pd.read_sql_query(
+            "SELECT key, n, wins, sum_return, sum_sq_return, sum_score FROM aggregates "
+            "WHERE scope = ? AND span = ? AND n > 1e-9 ORDER BY key",
+            self.conn,
+            params=[scope, span]
+        )
+
+        n = df["n"]
+        avg = df["sum_return"] / n
+        return pd.DataFrame({
+            scope: df["key"],
+            "signals": n,
+            "win_rate": df["wins"] / n,
+            "avg_return": avg,
+            "std_return": np.sqrt((df["sum_sq_return"] / n - avg * avg).clip(lower=0)),
+            "avg_score": df["sum_score"] / n
+        })
+
+    def append_summary(self, summary):
+        self.conn.execute(
+            f"INSERT INTO daily_summary VALUES ({', '.join('?' * len(SUMMARY_COLUMNS))})",
+            [iso_date(summary["date"])] + [summary[c] for c in SUMMARY_COLUMNS[1:]]
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # -------------------------------
+    # READ
+    # -------------------------------
+    def signals(self, start=None, end=None, symbols=None, resolved=False):
+        # resolved=True: only signals whose forward return is known (win is
+        # then a plain bool; otherwise a nullable boolean)
+        where, params = date_filter(start, end)
+        if symbols is not None:
+            symbols = list(symbols)
+            where += (" AND " if where else " WHERE ") + \
+                f"symbol IN ({', '.join('?' * len(symbols))})"
+            params += symbols
+        if resolved:
+            where += (" AND " if where else " WHERE ") + "forward_return_5d IS NOT NULL"
+
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(SIGNAL_COLUMNS)} FROM signals{where} ORDER BY rowid",
+            self.conn,
+            params=params
+        )
+        df["date"] = pd.to_datetime(df["date"])
+        df["win"] = df["win"].astype(bool if resolved else "boolean")
+        return df
+
+    def summaries(self, start=None, end=None):
+        where, params = date_filter(start, end)
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM daily_summary{where} ORDER BY rowid",
+            self.conn,
+            params=params
+        )
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def earliest_date(self):
+        value = self.conn.execute("SELECT MIN(date) FROM signals").fetchone()[0]
+        return None if value is None else pd.Timestamp(value)
+
+    def latest_date(self):
+        value = self.conn.execute("SELECT MAX(date) FROM signals").fetchone()[0]
+        return None if value is None else pd.Timestamp(value)
+
+    def signal_count(self, start=None, end=None):
+        where, params = date_filter(start, end)
+        return self.conn.execute(f"SELECT COUNT(*) FROM signals{where}", params).fetchone()[0]
+
+    def pending(self, until):
+        # Unresolved signals scored on a bar on or before `until`
+        df = pd.read_sql_query(
+            "SELECT symbol, date, bar_date FROM pending WHERE bar_date <= ?",
+            self.conn,
+            params=[iso_date(until)]
+        )
+        df["date"] = pd.to_datetime(df["date"])
+        df["bar_date"] = pd.to_datetime(df["bar_date"])
+        return df
+
+    def pending_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def summary_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM daily_summary").fetchone()[0]
+
+    def signal_totals(self):
+        # Averages over the whole log, computed inside SQLite (win rate and
+        # return over the resolved signals: AVG skips NULLs)
+        return dict(zip(
+            ["signals", "avg_signal_score", "win_rate", "avg_forward_return", "avg_atr"],
+            self.conn.execute(
+                "SELECT COUNT(*), AVG(signal_score), AVG(win), "
+                "AVG(forward_return_5d), AVG(atr) FROM signals"
+            ).fetchone()
+        ))
+
+    # -------------------------------
+    # EXCEL (IMPORT ONCE / EXPORT ON DEMAND)
+    # -------------------------------
+    def migrate(self, report_dir):
+        # The workbook's forward_return_5d / win looked 5 bars back, not
+        # forward: imported signals are logged unresolved and queued (scored
+        # on the bar of their date) so the resolver recomputes them
+        if self.get_meta("migrated"):
+            if self.get_meta("legacy_requeued") is None:
+                # stores migrated before imports were queued: once, all of it
+                self.requeue_all()
+                self.set_meta("legacy_requeued", pd.Timestamp.now().isoformat(timespec="seconds"))
+                self.commit()
+            return 0
+
+        migrated = 0
+
+        signal_log = os.path.join(report_dir, "signal_log.xlsx")
+        if os.path.exists(signal_log):
+            old = pd.read_excel(signal_log)
+            records = [
+                {**r, "forward_return_5d": None, "win": None, "bar_date": r["date"]}
+                for r in old[SIGNAL_COLUMNS].to_dict("records")
+            ]
+            self.append_signals(records)
+            self.queue_pending(records)
+            migrated += len(old)
+
+        daily_learning = os.path.join(report_dir, "daily_learning.xlsx")
+        if os.path.exists(daily_learning):
+            old = pd.read_excel(daily_learning)
+            for row in old[SUMMARY_COLUMNS].to_dict("records"):
+                self.append_summary(row)
+            migrated += len(old)
+
+        now = pd.Timestamp.now().isoformat(timespec="seconds")
+        self.set_meta("migrated", now)
+        self.set_meta("legacy_requeued", now)
+        self.commit()
+        return migrated
+
+    def export_excel(self, report_dir=REPORT_DIR, start=None, end=None):
+        # Streams straight from the cursor into the workbooks
+        where, params = date_filter(start, end)
+        counts = []
+
+        for file, table, columns in [
+            ("signal_log.xlsx", "signals", SIGNAL_COLUMNS),
+            ("daily_learning.xlsx", "daily_summary", SUMMARY_COLUMNS)
+        ]:
+            cursor = self.conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY rowid", params
+            )
+            rows = (
+                [pd.Timestamp(r[0]).date()] + list(r[1:]) for r in cursor
+            )
+            if table == "signals":
+                rows = (r[:4] + [optional(r[4], bool)] + r[5:] for r in rows)
+
+            with ReportWriter(os.path.join(report_dir, file)) as report:
+                counts.append(report.write_rows("Sheet1", columns, rows))
+
+        return tuple(counts)
+
+
+if __name__ == "__main__":
+    # python tools/signal_store.py export [start] [end]
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+
+    if command == "export":
+        start = sys.argv[2] if len(sys.argv) > 2 else None
+        end = sys.argv[3] if len(sys.argv) > 3 else None
+
+        store = SignalStore()
+        n_signals, n_summaries = store.export_excel(start=start, end=end)
+        store.close()
+
+        print(f"✅ EXPORTED {n_signals} SIGNALS + {n_summaries} DAILY SUMMARIES -> {REPORT_DIR}")
+    else:
+        raise ValueError(f"Unknown command: {command}")
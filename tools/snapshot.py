@@ -0,0 +1,125 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from panel import Panel, open_panel, panel_dir, TREND_LABELS
+
+# ===============================
+# LATEST-BAR SNAPSHOT
+# ===============================
+# panel/<kind>/snapshot.npz : the last SNAPSHOT_BARS bars of every field for
+# every symbol (its own bars, newest last, NaN-padded in front when it has
+# fewer), their dates and each symbol's total bar count.
+#
+# A few hundred KB, loaded whole: "latest value" lookups (weekly picks,
+# daily report, dashboard metrics) are dictionary + array reads, with no
+# per-symbol file I/O. The feature stage publishes it after the panel.
+SNAPSHOT_BARS = 5
+
+
+def snapshot_path(kind):
+    return os.path.join(panel_dir(kind), "snapshot.npz")
+
+
+def build_snapshot(kind="features", bars=SNAPSHOT_BARS):
+    panel = Panel(kind)
+    values = np.asarray(panel.values)
+    n_sym, _, n_fields = values.shape
+
+    present = ~np.isnan(values).all(axis=2)
+    lengths = present.sum(axis=1)
+
+    # rank 1 = the symbol's last bar, 2 = the one before, ...
+    rank = present[:, ::-1].cumsum(axis=1)[:, ::-1]
+
+    out = np.full((n_sym, bars, n_fields), np.nan)
+    dates = np.full((n_sym, bars), np.datetime64("NaT"), dtype="datetime64[D]")
+    day = panel.dates.values.astype("datetime64[D]")
+
+    for k in range(1, bars + 1):
+        has = lengths >= k
+        if not has.any():
+            break
+        pos = (present & (rank == k)).argmax(axis=1)[has]
+        out[has, bars - k] = values[has, pos]
+        dates[has, bars - k] = day[pos]
+
+    tmp = snapshot_path(kind) + ".tmp.npz"
+    np.savez(
+        tmp,
+        symbols=np.array(panel.symbols, dtype=str),
+        fields=np.array(panel.fields, dtype=str),
+        values=out,
+        dates=dates,
+        lengths=lengths
+    )
+    os.replace(tmp, snapshot_path(kind))
+    return out.shape
+
+
+class Snapshot:
+
+    def __init__(self, kind="features"):
+        with np.load(snapshot_path(kind)) as data:
+            self.symbols = list(data["symbols"])
+            self.fields = list(data["fields"])
+            self.values = data["values"]
+            self.dates = data["dates"]
+            self.lengths = data["lengths"]
+
+        self.kind = kind
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def length(self, symbol):
+        # total number of bars the symbol has in the panel
+        return int(self.lengths[self.index[symbol]])
+
+    def latest(self, symbol, back=0):
+        # {field: value} of the last bar (back=1: the one before, ...);
+        # None when the symbol has no such bar in the snapshot
+        i = self.index[symbol]
+        j = self.values.shape[1] - 1 - back
+        if j < 0 or np.isnat(self.dates[i, j]):
+            return None
+
+        row = dict(zip(self.fields, self.values[i, j].tolist()))
+        row["date"] = pd.Timestamp(self.dates[i, j])
+        if "trend" in row:
+            row["trend"] = TREND_LABELS.get(row["trend"])
+        return row
+
+    def frame(self, symbol):
+        # the snapshot bars of one symbol as a DataFrame (like Panel.frame)
+        i = self.index[symbol]
+        rows = ~np.isnat(self.dates[i])
+
+        df = pd.DataFrame(self.values[i][rows], columns=self.fields)
+        df.insert(0, "date", pd.to_datetime(self.dates[i][rows]))
+
+        if "trend" in df.columns:
+            df["trend"] = df["trend"].map(TREND_LABELS)
+
+        return df
+
+
+def open_snapshot(kind="features"):
+    # (Re)builds the snapshot when it is missing or older than the panel
+    open_panel(kind)
+    path = snapshot_path(kind)
+    meta = os.path.join(panel_dir(kind), "meta.json")
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(meta):
+        build_snapshot(kind)
+    return Snapshot(kind)
+
+
+if __name__ == "__main__":
+    # python tools/snapshot.py [prices|features]
+    kinds = sys.argv[1:] or ["features"]
+
+    for kind in kinds:
+        open_panel(kind)
+        shape = build_snapshot(kind)
+        print(f"✅ {kind.upper()} SNAPSHOT: {shape[0]} symbols x {shape[1]} bars x {shape[2]} fields")
@@ -0,0 +1,190 @@
+import os
+import json
+import sqlite3
+import pandas as pd
+
+# ===============================
+# RUN STATE STORE (SQLITE, WAL)
+# ===============================
+# Replaces state/last_learn_<SYMBOL>.json, state/learned_atr/<SYMBOL>.json and
+# the per-symbol stoploss CSVs of run.py. Everything a run writes goes into one
+# transaction, committed once at the end, so a crash leaves the previous
+# consistent state behind instead of a torn mix of files.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS learn_dates (
+    symbol TEXT PRIMARY KEY,
+    date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS learned_atr (
+    symbol TEXT PRIMARY KEY,
+    best_atr_multiplier REAL NOT NULL,
+    average_r REAL
+);
+CREATE TABLE IF NOT EXISTS stoploss_history (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close_price REAL,
+    atr REAL,
+    atr_multiplier REAL,
+    stoploss REAL
+);
+CREATE INDEX IF NOT EXISTS idx_stoploss_symbol ON stoploss_history (symbol);
+CREATE TABLE IF NOT EXISTS last_stoploss (
+    symbol TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    stoploss REAL
+);
+"""
+
+# Rebuilds last_stoploss from the history (stores created before it existed)
+BACKFILL_LAST_STOPLOSS = """
+INSERT OR REPLACE INTO last_stoploss (symbol, date, stoploss)
+SELECT symbol, date, stoploss FROM stoploss_history
+WHERE rowid IN (SELECT MAX(rowid) FROM stoploss_history GROUP BY symbol)
+"""
+
+
+class StateStore:
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        if self.conn.execute("SELECT COUNT(*) FROM last_stoploss").fetchone()[0] == 0:
+            self.conn.execute(BACKFILL_LAST_STOPLOSS)
+
+        self.conn.commit()
+        self.pending_stoplosses = []
+
+    # -------------------------------
+    # BULK READS (ONCE AT STARTUP)
+    # -------------------------------
+    def learn_dates(self):
+        return dict(self.conn.execute("SELECT symbol, date FROM learn_dates"))
+
+    def learned_multipliers(self):
+        return dict(self.conn.execute(
+            "SELECT symbol, best_atr_multiplier FROM learned_atr"
+        ))
+
+    def last_stoplosses(self):
+        # symbol -> most recent stoploss; constant size, independent of how
+        # long the trailing history has grown
+        return {
+            symbol: float(stoploss)
+            for symbol, stoploss in self.conn.execute(
+                "SELECT symbol, stoploss FROM last_stoploss"
+            )
+            if stoploss is not None
+        }
+
+    # -------------------------------
+    # WRITES (COMMITTED TOGETHER)
+    # -------------------------------
+    def set_learned(self, symbol, best_atr_multiplier, average_r, learn_date):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO learned_atr VALUES (?, ?, ?)",
+            (symbol, best_atr_multiplier, average_r)
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO learn_dates VALUES (?, ?)",
+            (symbol, learn_date)
+        )
+
+    def append_stoploss(self, symbol, row):
+        # Buffered; written append-only by commit()
+        self.pending_stoplosses.append(
+            (symbol, row["date"], row["close_price"], row["atr"],
+             row["atr_multiplier"], row["stoploss"])
+        )
+
+    def commit(self):
+        if self.pending_stoplosses:
+            self.conn.executemany(
+                "INSERT INTO stoploss_history VALUES (?, ?, ?, ?, ?, ?)",
+                self.pending_stoplosses
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO last_stoploss VALUES (?, ?, ?)",
+                [(r[0], r[1], r[5]) for r in self.pending_stoplosses]
+            )
+            self.pending_stoplosses = []
+
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # -------------------------------
+    # ONE-TIME MIGRATION
+    # -------------------------------
+    def migrate(self, state_dir, learn_dir, data_dir):
+        done = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'migrated'"
+        ).fetchone()
+        if done:
+            return 0
+
+        migrated = 0
+
+        if os.path.isdir(state_dir):
+            for file in sorted(os.listdir(state_dir)):
+                if not (file.startswith("last_learn_") and file.endswith(".json")):
+                    continue
+                try:
+                    with open(os.path.join(state_dir, file), "r") as f:
+                        learn_date = json.load(f)["date"]
+                except Exception:
+                    continue
+                symbol = file[len("last_learn_"):-len(".json")]
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO learn_dates VALUES (?, ?)",
+                    (symbol, learn_date)
+                )
+                migrated += 1
+
+        if os.path.isdir(learn_dir):
+            for file in sorted(os.listdir(learn_dir)):
+                if not file.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(learn_dir, file), "r") as f:
+                        learned = json.load(f)
+                except Exception:
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO learned_atr VALUES (?, ?, ?)",
+                    (file[:-len(".json")], float(learned["best_atr_multiplier"]),
+                     learned.get("average_r"))
+                )
+                migrated += 1
+
+        if os.path.isdir(data_dir):
+            for file in sorted(os.listdir(data_dir)):
+                if not file.endswith(".csv"):
+                    continue
+                try:
+                    old = pd.read_csv(os.path.join(data_dir, file))
+                except Exception:
+                    continue
+                if "stoploss" not in old.columns:
+                    continue
+                symbol = file[:-len(".csv")]
+                for row in old.to_dict("records"):
+                    self.append_stoploss(symbol, row)
+                migrated += 1
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('migrated', ?)",
+            (pd.Timestamp.now().isoformat(timespec="seconds"),)
+        )
+        self.commit()
+        return migrated
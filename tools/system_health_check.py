@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from signal_store import SignalStore
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "market_ai"))
 
@@ -57,12 +58,14 @@ else:
 # ===============================
 # 4. SIGNAL LOG
 # ===============================
-signal_log = os.path.join(REPORT_DIR, "signal_log.xlsx")
-
-if os.path.exists(signal_log):
-    df = pd.read_excel(signal_log)
-    print(f"✅ Signals logged: {len(df)}")
-    if len(df) < 50:
+signal_store = SignalStore()
+signal_count = signal_store.signal_count()
+summary_count = signal_store.summary_count()
+signal_store.close()
+
+if signal_count:
+    print(f"✅ Signals logged: {signal_count}")
+    if signal_count < 50:
         print("⚠️ Signal history still building")
 else:
     print("❌ Signal log missing")
@@ -71,11 +74,8 @@ else:
 # ===============================
 # 5. DAILY LEARNING
 # ===============================
-daily_learning = os.path.join(REPORT_DIR, "daily_learning.xlsx")
-
-if os.path.exists(daily_learning):
-    dl = pd.read_excel(daily_learning)
-    print(f"✅ Daily learning rows: {len(dl)}")
+if summary_count:
+    print(f"✅ Daily learning rows: {summary_count}")
 else:
     print("❌ Daily learning file missing")
     status_ok = False